@@ -0,0 +1,135 @@
+"""Offline stand-ins for Telegram: a Bot session that never touches the network
+and builders for synthetic updates.
+
+    bot = fake_bot()
+    await dp.feed_update(bot, message_update(bot, user_id=1, text="/start"))
+"""
+import asyncio
+import itertools
+from datetime import datetime
+
+from aiogram import Bot, methods
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Document, File, Message, Update
+
+FAKE_TOKEN = "123456:FAKE-TOKEN-FOR-OFFLINE-RUNS"
+
+# Methods whose result is a Message; everything else just returns True
+_MESSAGE_METHODS = (
+    methods.SendMessage,
+    methods.SendDocument,
+    methods.EditMessageText,
+    methods.EditMessageReplyMarkup,
+)
+
+
+class FakeSession(BaseSession):
+    """Answers every Bot API call locally and records what was sent.
+
+    ``files`` maps file_id -> bytes for documents the bot may download.
+    """
+
+    def __init__(self, latency=0.0, record=True, files=None):
+        super().__init__()
+        self.latency = latency
+        self.record = record
+        self.files = files if files is not None else {}
+        self.sent = []
+        self._ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.record:
+            self.sent.append(method)
+        if isinstance(method, _MESSAGE_METHODS):
+            message_id = next(self._ids)
+            extra = {}
+            if isinstance(method, methods.SendDocument):
+                extra["document"] = Document(file_id=f"fake-file-{message_id}", file_unique_id=f"u{message_id}")
+            else:
+                extra["text"] = getattr(method, "text", None) or ""
+            return Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=Chat(id=getattr(method, "chat_id", None) or 0, type="private"),
+                **extra
+            )
+        if isinstance(method, methods.GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_path=method.file_id)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        # url ends with the file_path, which is the file_id (see GetFile above)
+        data = self.files.get(url.rsplit("/", 1)[-1], b"")
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    async def close(self):
+        pass
+
+
+def fake_bot(**session_kwargs):
+    return Bot(token=FAKE_TOKEN, session=FakeSession(**session_kwargs))
+
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def raw_message_update(user_id, text):
+    """Telegram-shaped dict for a private text message (also usable as webhook JSON)."""
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(datetime.now().timestamp()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    }
+
+
+def raw_callback_update(user_id, data):
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(user_id),
+            "from": _user(user_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(datetime.now().timestamp()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "…",
+            },
+        },
+    }
+
+
+def raw_document_update(user_id, file_id, file_name, file_size=None):
+    update = raw_message_update(user_id, None)
+    message = update["message"]
+    del message["text"]
+    message["document"] = {"file_id": file_id, "file_unique_id": file_id,
+                           "file_name": file_name, "file_size": file_size}
+    return update
+
+
+def message_update(bot, user_id, text):
+    return Update.model_validate(raw_message_update(user_id, text), context={"bot": bot})
+
+
+def callback_update(bot, user_id, data):
+    return Update.model_validate(raw_callback_update(user_id, data), context={"bot": bot})
+
+
+def document_update(bot, user_id, file_id, file_name, file_size=None):
+    return Update.model_validate(raw_document_update(user_id, file_id, file_name, file_size), context={"bot": bot})
@@ -0,0 +1,105 @@
+"""Production insert throughput with and without group commit.
+
+N concurrent writers (coroutines standing in for workers pressing
+"✅ Tasdiqlash" at shift end) each insert --entries rows, awaiting each one
+before the next, in two ways:
+
+  direct   one transaction per entry on the db thread pool (the old
+           asave_production)
+  grouped  db.asave_production: the group-commit writer thread
+
+Both modes commit with the same --synchronous setting (FULL by default,
+i.e. every acknowledged entry is on disk), on a fresh database in a
+temporary directory, and are reported as entries per second with the
+per-entry latency a handler waits for.
+
+    python -m benchmarks.group_commit --writers 1 10 50 200 --entries 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import db
+from benchmarks.stats import percentile
+
+MODES = ("direct", "grouped")
+
+
+async def run_mode(mode, writers, entries):
+    save = db._make_async(db.save_production) if mode == "direct" else db.asave_production
+    latencies = []
+
+    async def writer(i):
+        for n in range(entries):
+            start = time.perf_counter()
+            await save({
+                "name": f"Ishchi {i:05d}",
+                "production_type": "Qolip 1",
+                "quantity": n + 1,
+                "date": datetime.now(db.LOCAL_TZ),
+            })
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(writers)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "mode": mode,
+        "writers": writers,
+        "entries": len(latencies),
+        "seconds": elapsed,
+        "per_second": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def run(args):
+    results = []
+    for writers in args.writers:
+        for mode in MODES:
+            with tempfile.TemporaryDirectory() as tmp:
+                db.DB_NAME = os.path.join(tmp, "factory.db")
+                db.close_all()
+                db.init_db()
+                try:
+                    results.append(asyncio.run(run_mode(mode, writers, args.entries)))
+                finally:
+                    db.close_all()
+            print_result(results[-1])
+    return results
+
+
+def print_result(r):
+    print(f"{r['writers']:>8}{r['mode']:>9}{r['entries']:>9}{r['per_second']:>12.0f}"
+          f"{r['p50'] * 1000:>10.2f}{r['p99'] * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--entries", type=int, default=50, help="entries per writer")
+    parser.add_argument("--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL", "EXTRA"))
+    parser.add_argument("--window", type=float, default=db.GROUP_COMMIT_WINDOW,
+                        help="group-commit window in seconds")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    db.SYNCHRONOUS = db.GROUP_COMMIT_SYNCHRONOUS = args.synchronous
+    db.production_writer = db.ProductionWriter(window=args.window)
+    print(f"synchronous={args.synchronous} window={args.window * 1000:g} ms")
+    print(f"{'writers':>8}{'mode':>9}{'entries':>9}{'entries/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    results = run(args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
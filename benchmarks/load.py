@@ -0,0 +1,215 @@
+"""Offline load test: simulated workers and admins driving the Dispatcher.
+
+Every simulated user is a coroutine that logs in and then loops until the
+run ends, sending one update at a time through ``dp.feed_update`` with an
+exponentially distributed think time (mean --think seconds) before each:
+
+  worker  "➕ Ishlab chiqarishni Qo‘shish" -> mold from the picker ->
+          quantity -> "✅ Tasdiqlash"; now and then "📝 Mening Yozuvlarim"
+  admin   "🗓 Kunlik Hisobot" or "📊 Barcha Ma'lumotlar"
+
+Telegram is the fake bot session with --latency seconds per API call, so
+replies and admin alerts cost what a network round trip would. Each update
+is timed from feed_update to return, i.e. including the handler's replies,
+and reported per step (one step = one handler) as percentiles, with the
+overall throughput.
+
+Several --workers values ramp the load, one run each, and a closing table
+shows how confirm_prod latency changes with the number of workers:
+
+    python -m benchmarks.load --workers 10 50 100 200 --admins 2 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+os.environ.setdefault("PREWARM_REPORTS", "0")
+os.environ.setdefault("BOT_TOKEN", "123456:FAKE-TOKEN-FOR-OFFLINE-RUNS")
+
+import db  # noqa: E402
+import main as app  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.fakes import callback_update, fake_bot, message_update  # noqa: E402
+from benchmarks.stats import percentile  # noqa: E402
+
+ADMIN_CHAT_BASE = 1
+WORKER_CHAT_BASE = 100_000
+MY_ENTRIES_SHARE = 0.2  # of worker iterations
+MONTHLY_SHARE = 0.3  # of admin report requests; the rest are daily reports
+STEPS = (
+    "start", "username", "password",
+    "prod_start", "mold_pick", "quantity", "confirm_prod", "my_entries",
+    "daily_report", "all_data",
+)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def feed(self, bot, step, update):
+        start = time.perf_counter()
+        try:
+            await app.dp.feed_update(bot, update)
+        except Exception as e:
+            self.errors[step] += 1
+            if self.errors[step] == 1:
+                print(f"{step}: {e!r}", file=sys.stderr)
+        self.latencies[step].append(time.perf_counter() - start)
+
+    def summary(self):
+        out = {}
+        for step in sorted(self.latencies, key=lambda s: STEPS.index(s) if s in STEPS else len(STEPS)):
+            values = sorted(self.latencies[step])
+            out[step] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+                "errors": self.errors[step],
+            }
+        return out
+
+
+async def think(rnd, mean, deadline):
+    if mean:
+        await asyncio.sleep(min(rnd.expovariate(1 / mean), max(deadline - time.monotonic(), 0)))
+
+
+async def login(rec, bot, chat_id, username, password):
+    await rec.feed(bot, "start", message_update(bot, chat_id, "/start"))
+    await rec.feed(bot, "username", message_update(bot, chat_id, username))
+    await rec.feed(bot, "password", message_update(bot, chat_id, password))
+
+
+async def worker(rec, bot, chat_id, username, mold_ids, rnd, args, deadline):
+    await login(rec, bot, chat_id, username, synthetic.WORKER_PASSWORD)
+    while time.monotonic() < deadline:
+        await think(rnd, args.think, deadline)
+        if rnd.random() < MY_ENTRIES_SHARE:
+            await rec.feed(bot, "my_entries", message_update(bot, chat_id, "📝 Mening Yozuvlarim"))
+            continue
+        steps = [
+            ("prod_start", message_update(bot, chat_id, "➕ Ishlab chiqarishni Qo‘shish")),
+            ("mold_pick", callback_update(bot, chat_id, f"mold:prod:{rnd.choice(mold_ids)}")),
+            ("quantity", message_update(bot, chat_id, str(rnd.randint(1, 200)))),
+            ("confirm_prod", message_update(bot, chat_id, "✅ Tasdiqlash")),
+        ]
+        for i, (step, update) in enumerate(steps):
+            if i:
+                await think(rnd, args.think, deadline)
+            await rec.feed(bot, step, update)
+
+
+async def admin(rec, bot, chat_id, rnd, args, deadline):
+    await login(rec, bot, chat_id, synthetic.ADMIN_USERNAME, synthetic.ADMIN_PASSWORD)
+    while time.monotonic() < deadline:
+        await think(rnd, args.admin_think, deadline)
+        if time.monotonic() >= deadline:
+            break
+        if rnd.random() < MONTHLY_SHARE:
+            await rec.feed(bot, "all_data", message_update(bot, chat_id, "📊 Barcha Ma'lumotlar"))
+        else:
+            await rec.feed(bot, "daily_report", message_update(bot, chat_id, "🗓 Kunlik Hisobot"))
+
+
+async def run_level(workers, args, seed):
+    rnd = random.Random(seed)
+    rec = Recorder()
+    bot = fake_bot(latency=args.latency, record=False)
+    await app.dp.emit_startup(bot=bot)
+    _, molds = db.get_molds_catalog()
+    mold_ids = [mold_id for mold_id, _ in molds]
+    db_workers, _ = synthetic.default_counts(args.rows)
+    db_workers = max(db_workers, max(args.workers))
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    users = [
+        worker(rec, bot, WORKER_CHAT_BASE + i, synthetic.worker_username(i % db_workers),
+               mold_ids, random.Random(rnd.random()), args, deadline)
+        for i in range(workers)
+    ] + [
+        admin(rec, bot, ADMIN_CHAT_BASE + i, random.Random(rnd.random()), args, deadline)
+        for i in range(args.admins)
+    ]
+    await asyncio.gather(*users)
+    elapsed = time.monotonic() - start
+    await app.dp.emit_shutdown(bot=bot)
+
+    summary = rec.summary()
+    total = sum(s["count"] for s in summary.values())
+    return {"workers": workers, "admins": args.admins, "elapsed": elapsed,
+            "updates": total, "throughput": total / elapsed, "steps": summary}
+
+
+async def run_levels(args, results):
+    # One event loop for all levels: the notifier's rate limiter lives across them
+    # Start a render worker first, so no level pays for spawning it
+    await app.render_service.render("warmup", os.getpid)
+    for workers in args.workers:
+        results.append(await run_level(workers, args, args.seed))
+        print_level(results[-1])
+
+
+def print_level(result):
+    print(f"\nworkers={result['workers']} admins={result['admins']}: "
+          f"{result['updates']} updates in {result['elapsed']:.1f} s ({result['throughput']:.1f}/s)")
+    print(f"  {'step':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for step, s in result["steps"].items():
+        print(f"  {step:<14}{s['count']:>7}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}"
+              f"{s['p99'] * 1000:>10.1f}{s['max'] * 1000:>10.1f}{s['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per load level")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a worker's updates")
+    parser.add_argument("--admin-think", type=float, default=10.0, help="mean seconds between report requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake Bot API call")
+    parser.add_argument("--rows", type=int, default=100_000, help="entries in the generated database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Reports are written to, and rendered from, the working directory
+        os.chdir(tmp)
+        try:
+            print(f"generating {args.rows} rows...", file=sys.stderr)
+            synthetic.generate(os.path.join(tmp, "factory.db"), args.rows, args.seed,
+                               workers=max(synthetic.default_counts(args.rows)[0], max(args.workers)))
+            db.DB_NAME = "factory.db"
+            db.close_all()
+            asyncio.run(run_levels(args, results))
+        finally:
+            app.render_service.shutdown()
+            db.close_all()
+            os.chdir(cwd)
+
+    print(f"\n{'workers':>8}{'updates/s':>11}{'confirm p50':>13}{'p95':>9}{'p99':>9}")
+    for r in results:
+        c = r["steps"].get("confirm_prod")
+        if c:
+            print(f"{r['workers']:>8}{r['throughput']:>11.1f}{c['p50'] * 1000:>11.1f}ms"
+                  f"{c['p95'] * 1000:>7.1f}ms{c['p99'] * 1000:>7.1f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
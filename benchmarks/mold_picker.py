@@ -0,0 +1,66 @@
+"""Mold picker benchmark: inline picker page vs the old one-row-per-mold keyboard.
+
+For each catalog size it reports the serialized reply_markup size and the
+time to build it, for the first page, a prefix search, and the old reply
+keyboard with every mold.
+
+    python -m benchmarks.mold_picker --sizes 100 1000 10000 100000
+"""
+import argparse
+import random
+import string
+import time
+
+from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
+
+from mold_catalog import MoldSnapshot
+
+
+def synthetic_molds(count, seed=0):
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        prefix = "".join(rnd.choices(string.ascii_uppercase, k=3))
+        names.add(f"{prefix}-{rnd.randrange(10000):04d}")
+    return list(enumerate(sorted(names), start=1))
+
+
+def old_keyboard(names):
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text=m)] for m in names] + [[KeyboardButton(text="❌ Bekor qilish")]],
+        resize_keyboard=True
+    )
+
+
+def measure(build, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        markup = build()
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, len(markup.model_dump_json(exclude_none=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'molds':>8}  {'variant':<14}{'build ms':>10}{'bytes':>10}")
+    for size in args.sizes:
+        snapshot = MoldSnapshot(0, synthetic_molds(size))
+        prefix = snapshot.names[len(snapshot.names) // 2][:2]
+        variants = [
+            ("picker page", lambda: snapshot.picker("prod")),
+            (f"prefix {prefix!r}", lambda: snapshot.picker("prod", prefix)),
+            ("old keyboard", lambda: old_keyboard(snapshot.names)),
+        ]
+        for label, build in variants:
+            # The old keyboard gets slow quickly; fewer repeats keep runs short
+            repeat = args.repeat if label != "old keyboard" else max(1, args.repeat // 10)
+            elapsed, size_bytes = measure(build, repeat)
+            print(f"{size:>8}  {label:<14}{elapsed * 1000:>10.3f}{size_bytes:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Message-routing benchmark: StateRouter lookups vs a linear filter chain.
+
+The bot used to register one handler per state with a lambda filter, which
+aiogram evaluates in registration order for every message. This builds both
+layouts with N synthetic flows (one state and one button each) and resolves
+the same synthetic updates against them.
+
+    python -m benchmarks.routing --flows 10 100 1000 10000 --updates 20000
+"""
+import argparse
+import random
+import time
+
+from state_router import StateRouter
+
+
+def _handler(msg):
+    return None
+
+
+def build_router(flows):
+    router = StateRouter()
+    for i in range(flows):
+        router.state(f"state_{i}")(_handler)
+        router.button(f"Tugma {i}")(_handler)
+    router.fallback(_handler)
+    return router
+
+
+def build_chain(flows, sessions):
+    """The old layout: (predicate, handler) pairs tried one after another."""
+    chain = []
+    for i in range(flows):
+        text = f"Tugma {i}"
+        chain.append((lambda uid, t, text=text: t == text, _handler))
+    for i in range(flows):
+        state = f"state_{i}"
+        chain.append((lambda uid, t, state=state: sessions.get(uid, {}).get("state") == state, _handler))
+    chain.append((lambda uid, t: True, _handler))
+    return chain
+
+
+def synthetic_updates(flows, count, seed=0):
+    """(user_id, text) pairs: half button presses, half free input in a random state."""
+    rnd = random.Random(seed)
+    sessions = {uid: {"state": f"state_{rnd.randrange(flows)}"} for uid in range(1000)}
+    updates = []
+    for _ in range(count):
+        uid = rnd.randrange(1000)
+        if rnd.random() < 0.5:
+            updates.append((uid, f"Tugma {rnd.randrange(flows)}"))
+        else:
+            updates.append((uid, str(rnd.randrange(1, 500))))
+    return sessions, updates
+
+
+def time_router(router, sessions, updates):
+    start = time.perf_counter()
+    for uid, text in updates:
+        router.resolve_message(sessions.get(uid, {}).get("state"), text)
+    return time.perf_counter() - start
+
+
+def time_chain(chain, updates):
+    start = time.perf_counter()
+    for uid, text in updates:
+        for predicate, handler in chain:
+            if predicate(uid, text):
+                break
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'flows':>7}{'router us/upd':>16}{'chain us/upd':>16}{'speedup':>10}")
+    for flows in args.flows:
+        sessions, updates = synthetic_updates(flows, args.updates)
+        t_router = time_router(build_router(flows), sessions, updates)
+        t_chain = time_chain(build_chain(flows, sessions), updates)
+        per = 1e6 / len(updates)
+        print(f"{flows:>7}{t_router * per:>16.2f}{t_chain * per:>16.2f}{t_chain / t_router:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Startup-time benchmark for main.py.
+
+Each run starts a fresh interpreter and measures:
+  * import  — ``import main`` (dependencies, Bot/Dispatcher, handler setup)
+  * startup — the Dispatcher startup hooks (db.init_db on a fresh database)
+  * first   — handling the first update (/start) through a fake bot session
+  * total   — wall time from process launch until the first update is answered
+
+It also lists which heavy report modules got imported along the way; with
+lazy loading none of them should be.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("reports", "openpyxl", "pandas", "numpy", "pytz")
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import db
+db.DB_NAME = sys.argv[1]
+import main
+t_import = time.perf_counter() - t0
+
+import asyncio
+from benchmarks.fakes import fake_bot, message_update
+
+async def first_update():
+    bot = fake_bot()
+    t = time.perf_counter()
+    await main.dp.emit_startup(bot=bot)
+    t_startup = time.perf_counter() - t
+    t = time.perf_counter()
+    await main.dp.feed_update(bot, message_update(bot, 1, "/start"))
+    return t_startup, time.perf_counter() - t
+
+t_startup, t_first = asyncio.run(first_update())
+print(json.dumps({
+    "import": t_import,
+    "startup": t_startup,
+    "first": t_first,
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once(db_path):
+    env = dict(os.environ, PREWARM_REPORTS="0")
+    env.setdefault("BOT_TOKEN", "123456:FAKE-TOKEN-FOR-OFFLINE-RUNS")
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, db_path],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["total"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            # A fresh database each run so startup includes the migrations
+            results.append(run_once(os.path.join(tmp, f"startup_{i}.db")))
+
+    print(f"{'metric':<10}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for metric in ("import", "startup", "first", "total"):
+        values = [r[metric] * 1000 for r in results]
+        print(f"{metric:<10}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    print("heavy modules loaded at startup:", ", ".join(heavy) or "none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""Small statistics helpers shared by the benchmarks."""
+
+
+def percentile(sorted_values, p):
+    """The p-th percentile (nearest rank) of an already sorted list; nan if it is empty."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
@@ -0,0 +1,265 @@
+"""Benchmark suite for db.py and the report pipelines on seeded synthetic data.
+
+For each dataset size (production entries; see benchmarks/synthetic.py for
+what else is generated) it times:
+
+  get_productions    db.get_productions(), the whole table
+  get_user x1000     db.get_user() for random usernames
+  my_entries x100    "📝 Mening Yozuvlarim" through the Dispatcher, random workers
+  older_page x100    the "◀ Eskiroq" page of the same lists
+  monthly_build      reports.build_monthly_report(): text + Excel, in process
+  daily_build        reports.build_daily_report(): text + Excel, in process
+  all_data           "📊 Barcha Ma'lumotlar" through the Dispatcher: render
+                     pool, text chunks and file upload (report cache cleared)
+  daily_report       "🗓 Kunlik Hisobot", likewise
+  save_prod x1000    db.save_production(), one commit each (rows removed after)
+
+Wall time is the median (and minimum) over up to --repeat runs, stopping
+early once a case has used --budget seconds. Peak memory comes from one
+extra run under tracemalloc, so it counts Python allocations only: not
+SQLite's page cache, and not the render pool's worker process.
+
+Telegram is a fake bot session, so runs are offline and comparable across
+commits:
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --json before.json
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --compare before.json
+
+Generated databases are thrown away unless --data-dir is given, in which
+case they are kept there and reused by later runs (1M rows take a while).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("PREWARM_REPORTS", "0")
+os.environ.setdefault("BOT_TOKEN", "123456:FAKE-TOKEN-FOR-OFFLINE-RUNS")
+
+import db  # noqa: E402
+import main as app  # noqa: E402
+import report_cache  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.fakes import callback_update, fake_bot, message_update  # noqa: E402
+
+ADMIN_CHAT = 1
+WORKER_CHAT_BASE = 1000
+
+
+class Case:
+    __slots__ = ("name", "run", "setup")
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run      # coroutine function, the measured part
+        self.setup = setup  # coroutine function run untimed before each run
+
+
+async def measure(case, repeat, budget, memory):
+    times = []
+    spent = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - spent < budget):
+        if case.setup:
+            await case.setup()
+        start = time.perf_counter()
+        await case.run()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        if case.setup:
+            await case.setup()
+        tracemalloc.start()
+        await case.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"runs": len(times), "median": statistics.median(times), "min": min(times), "peak": peak}
+
+
+def dataset(data_dir, rows, seed):
+    """Directory holding the dataset's factory.db, generated if needed."""
+    month = datetime.now(db.LOCAL_TZ).strftime("%Y-%m")
+    # The data is laid out around the current month, so that is part of the name
+    path = os.path.join(data_dir, f"{rows}-s{seed}-{month}")
+    if not os.path.exists(os.path.join(path, "factory.db")):
+        os.makedirs(path, exist_ok=True)
+        print(f"generating {rows} rows...", file=sys.stderr)
+        synthetic.generate(os.path.join(path, "factory.db"), rows, seed)
+        db.close_all()
+    return path
+
+
+async def feed(bot, update):
+    await app.dp.feed_update(bot, update)
+
+
+async def login(bot, chat_id, username, password):
+    for text in ("/start", username, password):
+        await feed(bot, message_update(bot, chat_id, text))
+
+
+async def run_size(rows, seed, data_dir, args):
+    os.chdir(dataset(data_dir, rows, seed))
+    db.DB_NAME = "factory.db"
+    db.close_all()
+    # Render workers keep the working directory they were started in
+    app.render_service.shutdown()
+    app.report_cache.clear()
+
+    rnd = random.Random(seed)
+    workers, _ = synthetic.default_counts(rows)
+    bot = fake_bot(record=False)
+    await app.dp.emit_startup(bot=bot)
+
+    await login(bot, ADMIN_CHAT, synthetic.ADMIN_USERNAME, synthetic.ADMIN_PASSWORD)
+    worker_chats = []
+    for i in rnd.sample(range(workers), min(workers, 20)):
+        chat_id = WORKER_CHAT_BASE + i
+        await login(bot, chat_id, synthetic.worker_username(i), synthetic.WORKER_PASSWORD)
+        worker_chats.append(chat_id)
+    usernames = [synthetic.worker_username(rnd.randrange(workers)) for _ in range(1000)]
+
+    # Anchor for the older page: the oldest entry on each worker's first page
+    anchors = {}
+    for chat_id in worker_chats:
+        page = await db.aget_productions_for_worker(
+            app.user_sessions[chat_id]["worker_id"], app.ENTRIES_PAGE_SIZE
+        )
+        if page:
+            anchors[chat_id] = app.entry_key(page[-1])
+
+    import reports
+    now = datetime.now(db.LOCAL_TZ)
+    saved_ids = []
+
+    async def get_productions():
+        await db.aget_productions()
+
+    async def get_user():
+        for username in usernames:
+            db.get_user(username)
+
+    async def my_entries():
+        for i in range(100):
+            await feed(bot, message_update(bot, worker_chats[i % len(worker_chats)], "📝 Mening Yozuvlarim"))
+
+    async def older_page():
+        chats = list(anchors)
+        for i in range(100):
+            chat_id = chats[i % len(chats)]
+            await feed(bot, callback_update(bot, chat_id, f"entries:older:{anchors[chat_id]}"))
+
+    async def monthly_build():
+        report = await asyncio.to_thread(reports.build_monthly_report, now)
+        if report:
+            report_cache.remove_report_file(report[1])
+
+    async def daily_build():
+        report = await asyncio.to_thread(reports.build_daily_report, now.date())
+        if report:
+            report_cache.remove_report_file(report[1])
+
+    async def clear_cache():
+        app.report_cache.clear()
+
+    async def all_data():
+        await feed(bot, message_update(bot, ADMIN_CHAT, "📊 Barcha Ma'lumotlar"))
+
+    async def daily_report():
+        await feed(bot, message_update(bot, ADMIN_CHAT, "🗓 Kunlik Hisobot"))
+
+    async def save_production():
+        for i in range(1000):
+            db.save_production({
+                "name": synthetic.worker_name(i % workers),
+                "production_type": "BENCH",
+                "quantity": 1,
+                "date": now,
+            })
+            saved_ids.append(db.connect().execute("SELECT last_insert_rowid()").fetchone()[0])
+
+    cases = [
+        Case("get_productions", get_productions),
+        Case("get_user x1000", get_user),
+        Case("my_entries x100", my_entries),
+        Case("older_page x100", older_page),
+        Case("monthly_build", monthly_build),
+        Case("daily_build", daily_build),
+        Case("all_data", all_data, clear_cache),
+        Case("daily_report", daily_report, clear_cache),
+        Case("save_prod x1000", save_production),
+    ]
+    # Start the render pool outside the measurements
+    await all_data()
+
+    results = {}
+    try:
+        for case in cases:
+            if args.only and not any(o in case.name for o in args.only):
+                continue
+            results[case.name] = await measure(case, args.repeat, args.budget, not args.no_memory)
+            print_row(rows, case.name, results[case.name], args.baseline.get(str(rows), {}).get(case.name))
+    finally:
+        for entry_id in saved_ids:
+            db.delete_production(entry_id)
+        await app.dp.emit_shutdown(bot=bot)
+    return results
+
+
+def print_header(compare):
+    print(f"{'rows':>8}  {'case':<17}{'runs':>5}{'median ms':>12}{'min ms':>10}{'peak MiB':>10}"
+          + (f"{'vs base':>9}" if compare else ""))
+
+
+def print_row(rows, name, r, base):
+    peak = f"{r['peak'] / 2**20:>10.1f}" if r["peak"] is not None else f"{'-':>10}"
+    line = f"{rows:>8}  {name:<17}{r['runs']:>5}{r['median'] * 1000:>12.1f}{r['min'] * 1000:>10.1f}{peak}"
+    if base:
+        line += f"{r['median'] / base['median']:>8.2f}x"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds per case before it stops repeating")
+    parser.add_argument("--only", nargs="+", help="run only cases whose name contains one of these")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--data-dir", help="keep and reuse generated databases here")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare medians with")
+    args = parser.parse_args()
+    args.baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            args.baseline = json.load(f)["results"]
+
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.abspath(args.data_dir) if args.data_dir else tmp
+        print_header(args.compare)
+        try:
+            for rows in args.sizes:
+                results[str(rows)] = asyncio.run(run_size(rows, args.seed, data_dir, args))
+        finally:
+            app.render_service.shutdown()
+            db.close_all()
+            os.chdir(cwd)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Seeded synthetic data for benchmarks: users, molds and production entries.
+
+The same seed and size always give the same workers, molds, quantities and
+times of day. Entries are spread evenly over the days ending on the last
+day of the current month (at least two months of them), so "this month"
+and "today" are always fully populated for the report buttons. A few
+percent of entries use the legacy spellings the reports must still merge:
+the worker's username instead of the display name, and lower-cased mold
+names.
+
+Everything is written through db.py, like the bot does.
+
+    python -m benchmarks.synthetic /tmp/bench/factory.db --rows 100000
+"""
+import argparse
+import calendar
+import itertools
+import os
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+import db
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin"
+WORKER_PASSWORD = "1234"
+MIN_DAYS = 62
+ROWS_PER_DAY = 1000
+CHUNK_SIZE = 20_000
+LEGACY_SPELLING_RATE = 0.03
+
+
+def default_counts(rows):
+    """(workers, molds) for a dataset of ``rows`` entries."""
+    return max(20, rows // 1000), max(50, rows // 2000)
+
+
+def worker_username(i):
+    return f"worker{i:05d}"
+
+
+def worker_name(i):
+    return f"Ishchi {i:05d}"
+
+
+def mold_names(count, rnd):
+    names = set()
+    while len(names) < count:
+        prefix = "".join(rnd.choices(string.ascii_uppercase, k=2))
+        names.add(f"{prefix}-{rnd.randrange(1000):03d}")
+    return sorted(names)
+
+
+def date_range(rows, rows_per_day=ROWS_PER_DAY, today=None):
+    """(first_day, days): the day span the entries are spread over."""
+    today = today or datetime.now(db.LOCAL_TZ).date()
+    last_day = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    days = max(MIN_DAYS, -(-rows // rows_per_day))
+    return last_day - timedelta(days=days - 1), days
+
+
+def generate(path, rows, seed=0, workers=None, molds=None, rows_per_day=ROWS_PER_DAY, progress=None):
+    """Create the database at ``path`` and fill it; returns a summary dict."""
+    rnd = random.Random(seed)
+    default_workers, default_molds = default_counts(rows)
+    workers = workers or default_workers
+    molds = molds or default_molds
+
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    db.DB_NAME = path
+    db.close_all()
+    db.init_db()
+
+    db.add_user(ADMIN_USERNAME, ADMIN_PASSWORD, "Admin", is_admin=True)
+    for i in range(workers):
+        db.add_user(worker_username(i), WORKER_PASSWORD, worker_name(i))
+    mold_list = mold_names(molds, rnd)
+    for name in mold_list:
+        db.add_mold(name)
+
+    first_day, days = date_range(rows, rows_per_day)
+    # Some workers and molds are busier than others
+    worker_weights = list(itertools.accumulate(rnd.paretovariate(1.5) for _ in range(workers)))
+    mold_weights = list(itertools.accumulate(rnd.paretovariate(1.2) for _ in range(molds)))
+
+    def entries():
+        per_day, extra = divmod(rows, days)
+        for day in range(days):
+            date = datetime.combine(first_day + timedelta(days=day), datetime.min.time())
+            count = per_day + (1 if day < extra else 0)
+            # Shift hours 07:00-19:00, in time order like real entries
+            for seconds in sorted(rnd.randrange(7 * 3600, 19 * 3600) for _ in range(count)):
+                w = rnd.choices(range(workers), cum_weights=worker_weights)[0]
+                mold = mold_list[rnd.choices(range(molds), cum_weights=mold_weights)[0]]
+                if rnd.random() < LEGACY_SPELLING_RATE:
+                    name = worker_username(w)
+                    mold = mold.lower()
+                else:
+                    name = worker_name(w)
+                yield {
+                    "name": name,
+                    "production_type": mold,
+                    "quantity": rnd.randint(1, 200),
+                    "date": date + timedelta(seconds=seconds),
+                }
+
+    start = time.perf_counter()
+    chunk = []
+    written = 0
+    for entry in entries():
+        chunk.append(entry)
+        if len(chunk) >= CHUNK_SIZE:
+            db.save_productions(chunk)
+            written += len(chunk)
+            chunk.clear()
+            if progress:
+                progress(written, rows)
+    if chunk:
+        db.save_productions(chunk)
+        written += len(chunk)
+        if progress:
+            progress(written, rows)
+
+    return {
+        "rows": written,
+        "workers": workers,
+        "molds": molds,
+        "days": days,
+        "first_day": first_day.isoformat(),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="database file to create (must not exist)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--molds", type=int)
+    parser.add_argument("--rows-per-day", type=int, default=ROWS_PER_DAY)
+    args = parser.parse_args()
+
+    summary = generate(args.path, args.rows, args.seed, args.workers, args.molds, args.rows_per_day,
+                       progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+    print()
+    print(", ".join(f"{k}: {v}" for k, v in summary.items()))
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
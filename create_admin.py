@@ -30,7 +30,14 @@ CREATE TABLE IF NOT EXISTS productions (
 
 # Add one admin user
 admin_data = ("admin", "admin123", "Admin Boss", 1, 0, None)
-cur.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?)", admin_data)
+# Update in place if it exists: its entries refer to the row's id
+cur.execute("""
+    INSERT INTO users (username, password, name, is_admin, blocked, telegram_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (username) DO UPDATE SET
+        password = excluded.password, name = excluded.name, is_admin = excluded.is_admin,
+        blocked = excluded.blocked, telegram_id = excluded.telegram_id
+""", admin_data)
 
 conn.commit()
 conn.close()
@@ -1,22 +1,143 @@
+import asyncio
+import functools
+import logging
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import metrics
 
 DB_NAME = "factory.db"
 
+# Connection tuning (applied once per connection)
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 16384  # ~16 MB page cache per connection
+DB_WORKERS = 4  # max concurrent queries issued from async handlers
+SYNCHRONOUS = "NORMAL"  # WAL: commits survive a crash of the bot, not a power cut
+SLOW_QUERY_SECONDS = 1.0  # logged as a warning
+
+# Group commit of production entries (see ProductionWriter)
+GROUP_COMMIT_WINDOW = 0.001  # seconds to wait for more entries in a burst
+GROUP_COMMIT_MAX_ROWS = 500
+GROUP_COMMIT_SYNCHRONOUS = "FULL"  # the writer's commits are synced to disk
+
+log = logging.getLogger("db")
+query_log = logging.getLogger("db.query")
+
+# Production timestamps are stored as UTC epoch seconds. Everything shown to
+# users is Tashkent time (UTC+5, no DST), which is also how legacy text dates
+# were written.
+LOCAL_TZ = timezone(timedelta(hours=5), "Asia/Tashkent")
+_LOCAL_OFFSET = int(LOCAL_TZ.utcoffset(None).total_seconds())
+LEGACY_DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y",
+    "%d.%m.%Y %H:%M", "%d.%m.%Y",
+)
+
 # ======================
 # 🔌 Database Connection
 # ======================
+# Each thread keeps one long-lived connection instead of opening and
+# closing a new one on every call.
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+
+def _configure(conn):
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # Off by default in SQLite; entries reference users and molds
+    conn.execute("PRAGMA foreign_keys = ON")
+
+
 def connect():
-    conn = sqlite3.connect(DB_NAME)
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        _configure(conn)
+        _local.conn = conn
+        _local.generation = _generation
+        with _connections_lock:
+            _connections.append(conn)
     return conn
 
+
+def close_all():
+    """Commit queued production entries, then close every pooled connection (call on shutdown)."""
+    global _generation
+    production_writer.close()
+    with _connections_lock:
+        _generation += 1
+        while _connections:
+            _connections.pop().close()
+
 # ======================
-# 📦 Initialize Database
+# 🕒 Timestamps
 # ======================
-def init_db():
-    conn = connect()
-    cur = conn.cursor()
+def to_epoch(value):
+    """Convert a datetime, date, epoch number or legacy date string to UTC epoch seconds.
+
+    Naive datetimes, dates and strings are taken as Tashkent local time.
+    Returns None for empty or unparseable values.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return int(text)
+        for fmt in LEGACY_DATE_FORMATS:
+            try:
+                value = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=LOCAL_TZ)
+    return int(value.timestamp())
 
+
+def from_epoch(ts):
+    """UTC epoch seconds -> aware datetime in Tashkent time (None stays None)."""
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, LOCAL_TZ)
+
+
+def local_day_sql(column):
+    """SQL expression for the Tashkent calendar day (YYYY-MM-DD) of an epoch column."""
+    return f"date({column} + {_LOCAL_OFFSET}, 'unixepoch')"
+
+
+def _is_local_midnight(ts):
+    return (ts + _LOCAL_OFFSET) % 86400 == 0
+
+
+def _entry_order_sql(column):
+    """Sort key of a worker's entry list: the date, with unparsed (NULL) dates oldest."""
+    return f"IFNULL({column}, 0)"
+
+
+# ======================
+# 📦 Schema Migrations
+# ======================
+# The schema version lives in PRAGMA user_version. Each migration runs once,
+# in its own transaction, and bumps the version; append new ones to the end
+# of MIGRATIONS and never edit one that has shipped.
+def _migration_base_schema(cur):
     # Users table
     cur.execute("""
     CREATE TABLE IF NOT EXISTS users (
@@ -40,7 +161,7 @@ def init_db():
     )
     """)
 
-    # ✅ Ensure "model" column exists
+    # ✅ Ensure "model" column exists (databases created before it was added)
     cur.execute("PRAGMA table_info(productions)")
     columns = [row[1] for row in cur.fetchall()]
     if "model" not in columns:
@@ -54,152 +175,1084 @@ def init_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
+
+def _migration_production_indexes(cur):
+    # Reports filter by date and sum quantities per worker/mold
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_productions_date
+    ON productions (date, name, production_type, quantity)
+    """)
+    # "Mening Yozuvlarim" lists one worker's newest entries
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_productions_name_date
+    ON productions (name, date, production_type, quantity)
+    """)
+
+
+def _migration_worker_keyset_index(cur):
+    # Keyset pagination of a worker's entries walks (name, id)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_productions_name_id
+    ON productions (name, id)
+    """)
+
+
+def _migration_epoch_dates(cur):
+    # Rebuild productions with date as INTEGER UTC epoch seconds, converting
+    # the legacy Tashkent-local text dates on the way. A date that does not
+    # parse keeps its original text in date_text instead of being lost.
+    cur.connection.create_function("to_epoch", 1, to_epoch, deterministic=True)
+    cur.execute("""
+    CREATE TABLE productions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        production_type TEXT,
+        quantity INTEGER,
+        date INTEGER,
+        model TEXT,
+        date_text TEXT
+    )
+    """)
+    cur.execute("""
+    INSERT INTO productions_new (id, name, production_type, quantity, date, model, date_text)
+    SELECT id, name, production_type, quantity, epoch, model, CASE WHEN epoch IS NULL THEN date END
+    FROM (SELECT *, to_epoch(date) AS epoch FROM productions)
+    """)
+    unparsed = [row[0] for row in cur.execute(
+        "SELECT id FROM productions_new WHERE date_text IS NOT NULL ORDER BY id"
+    )]
+    if unparsed:
+        log.warning(
+            "%d production dates could not be parsed and were kept in date_text: ids %s",
+            len(unparsed), ", ".join(map(str, unparsed)),
+        )
+    cur.execute("DROP TABLE productions")
+    cur.execute("ALTER TABLE productions_new RENAME TO productions")
+    _migration_production_indexes(cur)
+    _migration_worker_keyset_index(cur)
+
+
+def _migration_daily_totals(cur):
+    # Rollup of SUM(quantity) per (day, worker, model), kept in step with
+    # productions by triggers so every write updates it in the same transaction
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS production_daily_totals (
+        day TEXT NOT NULL,
+        worker TEXT NOT NULL,
+        model TEXT NOT NULL,
+        qty INTEGER NOT NULL DEFAULT 0,
+        entries INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, worker, model)
+    ) WITHOUT ROWID
+    """)
+
+    def add(row):
+        return f"""
+        INSERT INTO production_daily_totals (day, worker, model, qty, entries)
+        SELECT {local_day_sql(row + ".date")}, COALESCE({row}.name, ''),
+               COALESCE({row}.production_type, ''), COALESCE({row}.quantity, 0), 1
+        WHERE {row}.date IS NOT NULL
+        ON CONFLICT (day, worker, model)
+        DO UPDATE SET qty = qty + excluded.qty, entries = entries + 1;
+        """
+
+    def remove(row):
+        match = f"""
+        day = {local_day_sql(row + ".date")}
+        AND worker = COALESCE({row}.name, '')
+        AND model = COALESCE({row}.production_type, '')
+        """
+        return f"""
+        UPDATE production_daily_totals
+        SET qty = qty - COALESCE({row}.quantity, 0), entries = entries - 1
+        WHERE {match};
+        DELETE FROM production_daily_totals WHERE {match} AND entries <= 0;
+        """
+
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS productions_totals_insert
+    AFTER INSERT ON productions
+    BEGIN {add("NEW")} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS productions_totals_delete
+    AFTER DELETE ON productions
+    BEGIN {remove("OLD")} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS productions_totals_update
+    AFTER UPDATE OF name, production_type, quantity, date ON productions
+    BEGIN {remove("OLD")} {add("NEW")} END
+    """)
+    _fill_named_daily_totals(cur)
+
+
+def _migration_data_version(cur):
+    # A counter bumped by every write that can change a report, so cached
+    # reports can be keyed on it (also visible to other processes)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    cur.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+
+    bump = "UPDATE meta SET value = value + 1 WHERE key = 'data_version';"
+    for name, event in [
+        ("productions_version_insert", "INSERT ON productions"),
+        ("productions_version_update", "UPDATE ON productions"),
+        ("productions_version_delete", "DELETE ON productions"),
+        ("users_version_update", "UPDATE OF name ON users"),
+        ("molds_version_insert", "INSERT ON molds"),
+        ("molds_version_delete", "DELETE ON molds"),
+    ]:
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} BEGIN {bump} END")
+
+
+def _migration_sessions(cur):
+    # Bot conversation state, so a restart does not log everyone out
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sessions (
+        user_id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated INTEGER NOT NULL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated)")
+
+
+def _migration_molds_version(cur):
+    # Bumped only by mold changes, so caches of the mold list are not
+    # invalidated by every production write the way data_version is
+    cur.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('molds_version', 0)")
+    bump = "UPDATE meta SET value = value + 1 WHERE key = 'molds_version';"
+    for name, event in [
+        ("molds_catalog_insert", "INSERT ON molds"),
+        ("molds_catalog_delete", "DELETE ON molds"),
+        ("molds_catalog_update", "UPDATE ON molds"),
+    ]:
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} BEGIN {bump} END")
+
+
+def _migration_notify_digest(cur):
+    # Admins who prefer production alerts batched into digests
+    cur.execute("ALTER TABLE users ADD COLUMN notify_digest INTEGER DEFAULT 0")
+
+
+def _migration_production_keys(cur):
+    # Entries point at their worker and mold by id instead of by name, so
+    # renaming a profile or a mold no longer orphans its history.
+    # Users get an integer key first (username stays unique)
+    cur.execute("""
+    CREATE TABLE users_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        name TEXT,
+        is_admin INTEGER DEFAULT 0,
+        blocked INTEGER DEFAULT 0,
+        telegram_id INTEGER,
+        notify_digest INTEGER DEFAULT 0
+    )
+    """)
+    cur.execute("""
+    INSERT INTO users_new (username, password, name, is_admin, blocked, telegram_id, notify_digest)
+    SELECT username, password, name, is_admin, blocked, telegram_id, notify_digest FROM users ORDER BY rowid
+    """)
+    cur.execute("DROP TABLE users")
+    cur.execute("ALTER TABLE users_new RENAME TO users")
+    # Stored names are matched case-insensitively (see _worker_id_sql)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users (name COLLATE NOCASE)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_molds_name_nocase ON molds (name COLLATE NOCASE)")
+
+    # Resolve each distinct stored spelling once, then rebuild productions
+    # with the keys filled in. name/production_type keep the text as entered;
+    # it is what reports show for entries no user or mold matches.
+    cur.execute("CREATE TEMP TABLE worker_keys (name TEXT PRIMARY KEY, id INTEGER)")
+    cur.execute(f"""
+    INSERT INTO worker_keys (name, id)
+    SELECT d.name, {_worker_id_sql("d.name")}
+    FROM (SELECT DISTINCT name FROM productions WHERE name IS NOT NULL) AS d
+    """)
+    cur.execute("CREATE TEMP TABLE mold_keys (name TEXT PRIMARY KEY, id INTEGER)")
+    cur.execute(f"""
+    INSERT INTO mold_keys (name, id)
+    SELECT d.production_type, {_mold_id_sql("d.production_type")}
+    FROM (SELECT DISTINCT production_type FROM productions WHERE production_type IS NOT NULL) AS d
+    """)
+    cur.execute("""
+    CREATE TABLE productions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        production_type TEXT,
+        quantity INTEGER,
+        date INTEGER,
+        model TEXT,
+        date_text TEXT,
+        worker_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+        mold_id INTEGER REFERENCES molds (id) ON DELETE SET NULL
+    )
+    """)
+    cur.execute("""
+    INSERT INTO productions_new (id, name, production_type, quantity, date, model, date_text, worker_id, mold_id)
+    SELECT p.id, p.name, p.production_type, p.quantity, p.date, p.model, p.date_text, w.id, m.id
+    FROM productions p
+    LEFT JOIN worker_keys w ON w.name = p.name
+    LEFT JOIN mold_keys m ON m.name = p.production_type
+    """)
+    # AUTOINCREMENT carries on from where the old table was, deleted ids included
+    cur.execute("""
+    UPDATE sqlite_sequence
+    SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'productions'), 0))
+    WHERE name = 'productions_new'
+    """)
+    cur.execute("DROP TABLE worker_keys")
+    cur.execute("DROP TABLE mold_keys")
+    cur.execute("DROP TABLE productions")
+    cur.execute("ALTER TABLE productions_new RENAME TO productions")
+
+    # Reports filter by date and sum quantities per worker/mold
+    cur.execute("""
+    CREATE INDEX idx_productions_date
+    ON productions (date, worker_id, mold_id, quantity)
+    """)
+    # Keyset pagination of a worker's entries walks (worker_id, id)
+    cur.execute("CREATE INDEX idx_productions_worker_id ON productions (worker_id, id)")
+    # Removing a mold nulls its entries' mold_id
+    cur.execute("CREATE INDEX idx_productions_mold_id ON productions (mold_id)")
+
+    # The rollup is keyed the same way; entries without a key keep their text
+    cur.execute("DROP TABLE production_daily_totals")
+    cur.execute("""
+    CREATE TABLE production_daily_totals (
+        day TEXT NOT NULL,
+        worker_id INTEGER NOT NULL,
+        mold_id INTEGER NOT NULL,
+        worker TEXT NOT NULL,
+        mold TEXT NOT NULL,
+        qty INTEGER NOT NULL DEFAULT 0,
+        entries INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, worker_id, mold_id, worker, mold)
+    ) WITHOUT ROWID
+    """)
+    _create_daily_totals_triggers(cur)
+    _fill_daily_totals(cur)
+    # The data_version triggers on productions and users went with the old tables
+    _migration_data_version(cur)
+
+
+def _migration_worker_date_index(cur):
+    # A worker's entries are listed newest first by entry date, not by id:
+    # imported history gets new ids but keeps its old dates.
+    cur.execute("DROP INDEX IF EXISTS idx_productions_worker_id")
+    cur.execute(f"""
+    CREATE INDEX idx_productions_worker_date
+    ON productions (worker_id, {_entry_order_sql("date")}, id)
+    """)
+
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_production_indexes,
+    _migration_worker_keyset_index,
+    _migration_epoch_dates,
+    _migration_daily_totals,
+    _migration_data_version,
+    _migration_sessions,
+    _migration_molds_version,
+    _migration_notify_digest,
+    _migration_production_keys,
+    _migration_worker_date_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _fill_named_daily_totals(cur):
+    # The rollup as keyed by names (migrations 5 to 9)
+    cur.execute("DELETE FROM production_daily_totals")
+    cur.execute(f"""
+    INSERT INTO production_daily_totals (day, worker, model, qty, entries)
+    SELECT {local_day_sql("date")}, COALESCE(name, ''), COALESCE(production_type, ''),
+           SUM(COALESCE(quantity, 0)), COUNT(*)
+    FROM productions
+    WHERE date IS NOT NULL
+    GROUP BY 1, 2, 3
+    """)
+    return cur.rowcount
+
+
+def _rollup_keys_sql(row):
+    """SQL for an entry's rollup key: day, worker_id, mold_id, worker, mold.
+
+    An entry linked to a user/mold is counted under its id (0 otherwise)
+    and an empty name; one that is not keeps the text it was entered with.
+    """
+    prefix = f"{row}." if row else ""
+    return (
+        local_day_sql(f"{prefix}date"),
+        f"COALESCE({prefix}worker_id, 0)",
+        f"COALESCE({prefix}mold_id, 0)",
+        f"CASE WHEN {prefix}worker_id IS NULL THEN COALESCE({prefix}name, '') ELSE '' END",
+        f"CASE WHEN {prefix}mold_id IS NULL THEN COALESCE({prefix}production_type, '') ELSE '' END",
+    )
+
+
+def _create_daily_totals_triggers(cur):
+    # Keep production_daily_totals in step with productions, so every write
+    # updates it in the same transaction
+    key_columns = ("day", "worker_id", "mold_id", "worker", "mold")
+
+    def add(row):
+        return f"""
+        INSERT INTO production_daily_totals (day, worker_id, mold_id, worker, mold, qty, entries)
+        SELECT {", ".join(_rollup_keys_sql(row))}, COALESCE({row}.quantity, 0), 1
+        WHERE {row}.date IS NOT NULL
+        ON CONFLICT (day, worker_id, mold_id, worker, mold)
+        DO UPDATE SET qty = qty + excluded.qty, entries = entries + 1;
+        """
+
+    def remove(row):
+        match = " AND ".join(f"{col} = {expr}" for col, expr in zip(key_columns, _rollup_keys_sql(row)))
+        return f"""
+        UPDATE production_daily_totals
+        SET qty = qty - COALESCE({row}.quantity, 0), entries = entries - 1
+        WHERE {match};
+        DELETE FROM production_daily_totals WHERE {match} AND entries <= 0;
+        """
+
+    cur.execute(f"""
+    CREATE TRIGGER productions_totals_insert
+    AFTER INSERT ON productions
+    BEGIN {add("NEW")} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER productions_totals_delete
+    AFTER DELETE ON productions
+    BEGIN {remove("OLD")} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER productions_totals_update
+    AFTER UPDATE OF name, production_type, quantity, date, worker_id, mold_id ON productions
+    BEGIN {remove("OLD")} {add("NEW")} END
+    """)
+
+
+def _fill_daily_totals(cur):
+    cur.execute("DELETE FROM production_daily_totals")
+    cur.execute(f"""
+    INSERT INTO production_daily_totals (day, worker_id, mold_id, worker, mold, qty, entries)
+    SELECT {", ".join(_rollup_keys_sql(""))}, SUM(COALESCE(quantity, 0)), COUNT(*)
+    FROM productions
+    WHERE date IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+    """)
+    return cur.rowcount
+
+
+def rebuild_daily_totals():
+    """Recompute production_daily_totals from the raw productions table.
+
+    Returns the number of rollup rows written.
+    """
+    conn = connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return _fill_daily_totals(conn.cursor())
+
+
+def get_schema_version():
+    return connect().execute("PRAGMA user_version").fetchone()[0]
+
+
+def get_data_version():
+    """Counter that changes whenever report data (entries, names, molds) changes."""
+    row = connect().execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+    return row[0] if row else 0
+
+
+# ======================
+# 📦 Initialize Database
+# ======================
+def init_db():
+    conn = connect()
+    # WAL is persistent in the database file, so it only needs setting once
+    conn.execute("PRAGMA journal_mode = WAL")
+
+    if get_schema_version() >= SCHEMA_VERSION:
+        return
+
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-check under the write lock in case another process migrated
+            if get_schema_version() >= number:
+                continue
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {number}")
+        log.info("Database migrated to schema version %d (%s)", number, migration.__name__)
 
 # ======================
 # 👥 User Management
 # ======================
+USER_COLUMNS = "id, username, password, name, is_admin, blocked, telegram_id, notify_digest"
+
+
+def _user_row(row):
+    return {
+        "id": row[0],
+        "username": row[1],
+        "password": row[2],
+        "name": row[3],
+        "is_admin": bool(row[4]),
+        "blocked": bool(row[5]),
+        "telegram_id": row[6],
+        "notify_digest": bool(row[7])
+    }
+
 def get_user(username):
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE username = ?", (username,))
+    cur.execute(f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,))
     row = cur.fetchone()
-    conn.close()
-    if row:
-        return {
-            "username": row[0],
-            "password": row[1],
-            "name": row[2],
-            "is_admin": bool(row[3]),
-            "blocked": bool(row[4]),
-            "telegram_id": row[5]
-        }
-    return None
+    return _user_row(row) if row else None
 
 def get_all_users():
+    """{username: user} for every user (the dicts as from get_user, minus "username")."""
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM users")
-    rows = cur.fetchall()
-    conn.close()
+    cur.execute(f"SELECT {USER_COLUMNS} FROM users")
     users = {}
-    for row in rows:
-        users[row[0]] = {
-            "password": row[1],
-            "name": row[2],
-            "is_admin": bool(row[3]),
-            "blocked": bool(row[4]),
-            "telegram_id": row[5]
-        }
+    for row in cur.fetchall():
+        user = _user_row(row)
+        users[user.pop("username")] = user
     return users
 
 def add_user(username, password, name, is_admin=False):
     conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO users (username, password, name, is_admin, blocked)
-        VALUES (?, ?, ?, ?, 0)
-    """, (username, password, name, int(is_admin)))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO users (username, password, name, is_admin, blocked)
+            VALUES (?, ?, ?, ?, 0)
+        """, (username, password, name, int(is_admin)))
 
 def update_user(username, updates: dict):
     conn = connect()
-    cur = conn.cursor()
-    for key, value in updates.items():
-        cur.execute(f"UPDATE users SET {key} = ? WHERE username = ?", (value, username))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.cursor()
+        for key, value in updates.items():
+            cur.execute(f"UPDATE users SET {key} = ? WHERE username = ?", (value, username))
 
 def delete_user(username):
     conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM users WHERE username = ?", (username,))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.cursor()
+        # The entries outlive the user (worker_id is set to NULL); keep the
+        # name they are shown under
+        cur.execute("""
+            UPDATE productions SET name = (SELECT name FROM users WHERE username = :username)
+            WHERE worker_id = (SELECT id FROM users WHERE username = :username)
+        """, {"username": username})
+        cur.execute("DELETE FROM users WHERE username = ?", (username,))
 
 def get_admin_telegram_ids():
     conn = connect()
     cur = conn.cursor()
     cur.execute("SELECT telegram_id FROM users WHERE is_admin = 1 AND telegram_id IS NOT NULL")
     rows = cur.fetchall()
-    conn.close()
     return [r[0] for r in rows if r[0]]
 
+def get_admin_notify_targets():
+    """(telegram_id, wants_digest) for every admin who has logged in to the bot."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT telegram_id, notify_digest FROM users WHERE is_admin = 1 AND telegram_id IS NOT NULL")
+    return [(r[0], bool(r[1])) for r in cur.fetchall() if r[0]]
+
 # ======================
 # 🛠 Mold Management
 # ======================
 def add_mold(name: str):
+    """Add a mold unless it exists; returns its id either way."""
     conn = connect()
-    cur = conn.cursor()
-    cur.execute("INSERT OR IGNORE INTO molds (name) VALUES (?)", (name.strip(),))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("INSERT OR IGNORE INTO molds (name) VALUES (?)", (name.strip(),))
+        return cur.execute("SELECT id FROM molds WHERE name = ?", (name.strip(),)).fetchone()[0]
 
 def get_all_molds():
     conn = connect()
     cur = conn.cursor()
     cur.execute("SELECT name FROM molds ORDER BY name COLLATE NOCASE")
     rows = cur.fetchall()
-    conn.close()
     return [r[0] for r in rows]
 
+def get_molds_catalog():
+    """(molds_version, [(id, name), ...]) read in one transaction, so they always match."""
+    conn = connect()
+    with conn:
+        conn.execute("BEGIN")
+        version = conn.execute("SELECT value FROM meta WHERE key = 'molds_version'").fetchone()[0]
+        molds = conn.execute("SELECT id, name FROM molds ORDER BY name COLLATE NOCASE").fetchall()
+    return version, molds
+
+def get_molds_version():
+    conn = connect()
+    return conn.execute("SELECT value FROM meta WHERE key = 'molds_version'").fetchone()[0]
+
+_probe = None
+_probe_lock = threading.Lock()
+
+
+def db_changed_marker():
+    """SQLite's data_version on a connection kept only for this probe.
+
+    It changes whenever any other connection (in this process or another)
+    commits, and is answered without reading any pages, so it is a cheap
+    "anything new?" probe. The probe connection never writes and is the same
+    whichever pool thread asks, so successive values are comparable.
+    """
+    global _probe
+    with _probe_lock:
+        if _probe is None or _probe[1] != _generation:
+            conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            _configure(conn)
+            with _connections_lock:
+                _connections.append(conn)
+            _probe = (conn, _generation)
+        return _probe[0].execute("PRAGMA data_version").fetchone()[0]
+
 def remove_mold(name: str):
     conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM molds WHERE name = ?", (name.strip(),))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.cursor()
+        # As in delete_user: the entries keep the name, not the id
+        cur.execute("""
+            UPDATE productions SET production_type = :name
+            WHERE mold_id = (SELECT id FROM molds WHERE name = :name)
+        """, {"name": name.strip()})
+        cur.execute("DELETE FROM molds WHERE name = ?", (name.strip(),))
 
 # ======================
 # 🏭 Production Management
 # ======================
+# Entries carry worker_id/mold_id keys. Writers may pass them; otherwise
+# they are looked up from the name and mold text, the same way the
+# migration backfilled old entries. The text is stored as well, as
+# entered, and shown for entries no user or mold matches.
+def _worker_id_sql(param):
+    """SQL for the id of the user a stored worker name means, or NULL.
+
+    A username (exact, then in any case), else a display name (any case)
+    that only one user has.
+    """
+    return f"""COALESCE(
+        (SELECT id FROM users WHERE username = trim({param})),
+        (SELECT id FROM users WHERE username = trim({param}) COLLATE NOCASE ORDER BY id LIMIT 1),
+        (SELECT CASE WHEN COUNT(*) = 1 THEN MIN(id) END FROM users WHERE name = trim({param}) COLLATE NOCASE)
+    )"""
+
+def _mold_id_sql(param):
+    """SQL for the id of the mold a stored mold name means (exact, then any case), or NULL."""
+    return f"""COALESCE(
+        (SELECT id FROM molds WHERE name = trim({param})),
+        (SELECT id FROM molds WHERE name = trim({param}) COLLATE NOCASE ORDER BY id LIMIT 1)
+    )"""
+
+# Which key goes with which text column, for update_production
+_KEY_OF_TEXT = {"name": ("worker_id", _worker_id_sql), "production_type": ("mold_id", _mold_id_sql)}
+
+INSERT_PRODUCTION_SQL = f"""
+    INSERT INTO productions (name, production_type, quantity, date, model, worker_id, mold_id)
+    VALUES (:name, :production_type, :quantity, :date, :model,
+            COALESCE(:worker_id, {_worker_id_sql(":name")}),
+            COALESCE(:mold_id, {_mold_id_sql(":production_type")}))
+"""
+
+
+def _production_params(data):
+    return {
+        "name": data["name"],
+        "production_type": data["production_type"],
+        "quantity": data["quantity"],
+        "date": to_epoch(data["date"]),
+        "model": data.get("model"),
+        "worker_id": data.get("worker_id"),
+        "mold_id": data.get("mold_id"),
+    }
+
+def _insert_production(cur, data):
+    cur.execute(INSERT_PRODUCTION_SQL, _production_params(data))
+    return cur.lastrowid
+
 def save_production(data: dict):
+    """Insert one entry in its own transaction; returns its id.
+
+    ``data`` has name, production_type, quantity and date, optionally
+    model, worker_id and mold_id.
+    """
     conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO productions (name, production_type, quantity, date, model)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        data["name"],
-        data["production_type"],
-        data["quantity"],
-        data["date"],
-        data.get("model")
-    ))
-    conn.commit()
-    conn.close()
+    with conn:
+        return _insert_production(conn.cursor(), data)
+
+def save_productions(rows):
+    """Insert several entries (dicts as for save_production) in one transaction."""
+    conn = connect()
+    with conn:
+        conn.executemany(INSERT_PRODUCTION_SQL, map(_production_params, rows))
+
+# Readers get the worker's and mold's current names, joined in here, or
+# the stored text for entries without a key
+PRODUCTIONS_JOINED = """productions p
+    LEFT JOIN users u ON u.id = p.worker_id
+    LEFT JOIN molds m ON m.id = p.mold_id"""
+PRODUCTION_COLUMNS = (
+    "p.id, COALESCE(u.name, p.name), COALESCE(m.name, p.production_type), "
+    "p.quantity, p.date, p.model, p.worker_id, p.mold_id"
+)
+
+
+def _production_row(row):
+    return {
+        "id": row[0],
+        "name": row[1],
+        "production_type": row[2],
+        "quantity": row[3],
+        "date": row[4],
+        "model": row[5],
+        "worker_id": row[6],
+        "mold_id": row[7]
+    }
 
 def get_productions():
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM productions ORDER BY date DESC, id DESC")
+    cur.execute(f"SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED} ORDER BY p.date DESC, p.id DESC")
     rows = cur.fetchall()
-    conn.close()
-    return [
-        {
-            "id": row[0],
-            "name": row[1],
-            "production_type": row[2],
-            "quantity": row[3],
-            "date": row[4],
-            "model": row[5] if len(row) > 5 else None
-        }
-        for row in rows
-    ]
+    return [_production_row(row) for row in rows]
 
-def update_production(entry_id, updates: dict):
+def iter_productions_between(start, end, batch_size=1000):
+    """Entries with start <= date < end, oldest first, yielded as the cursor reads them.
+
+    ``start``/``end`` accept anything to_epoch() does. Memory stays at one
+    batch no matter how many rows match.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED}
+        WHERE p.date >= ? AND p.date < ?
+        ORDER BY p.date, p.id
+    """, (to_epoch(start), to_epoch(end)))
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield _production_row(row)
+
+# Group keys accepted by aggregate_productions; "day" is the Tashkent date,
+# "name" and "production_type" the worker's and mold's current names
+AGGREGATE_KEYS = {
+    "day": local_day_sql("p.date"),
+    "name": "COALESCE(u.name, p.name)",
+    "production_type": "COALESCE(m.name, p.production_type)",
+    "model": "p.model",
+}
+# The same keys from the production_daily_totals rollup
+ROLLUP_KEYS = {
+    "day": "t.day",
+    "name": "COALESCE(u.name, NULLIF(t.worker, ''))",
+    "production_type": "COALESCE(m.name, NULLIF(t.mold, ''))",
+}
+
+def aggregate_productions(start, end, by=("day", "name", "production_type")):
+    """SUM(quantity) of entries with start <= date < end, grouped by ``by``.
+
+    Returns dicts with the group keys plus "quantity", ordered by the keys.
+    "day" comes back as a "YYYY-MM-DD" string in Tashkent time; a name is
+    None for entries stored without one. Whole-day ranges grouped by
+    day/name/production_type are answered from the production_daily_totals
+    rollup; anything else scans productions.
+    """
+    unknown = set(by) - AGGREGATE_KEYS.keys()
+    if unknown:
+        raise ValueError(f"Unknown aggregate keys: {', '.join(sorted(unknown))}")
+
+    start, end = to_epoch(start), to_epoch(end)
+    positions = ", ".join(str(i) for i in range(1, len(by) + 1))
+    group = f"GROUP BY {positions} ORDER BY {positions}" if by else ""
     conn = connect()
     cur = conn.cursor()
-    for key, value in updates.items():
-        cur.execute(f"UPDATE productions SET {key} = ? WHERE id = ?", (value, entry_id))
-    conn.commit()
-    conn.close()
+    if set(by) <= ROLLUP_KEYS.keys() and _is_local_midnight(start) and _is_local_midnight(end):
+        select = "".join(f"{ROLLUP_KEYS[key]}, " for key in by)
+        cur.execute(f"""
+            SELECT {select}SUM(t.qty) FROM production_daily_totals t
+            LEFT JOIN users u ON u.id = t.worker_id
+            LEFT JOIN molds m ON m.id = t.mold_id
+            WHERE t.day >= {local_day_sql("?")} AND t.day < {local_day_sql("?")}
+            {group}
+        """, (start, end))
+    else:
+        select = "".join(f"{AGGREGATE_KEYS[key]}, " for key in by)
+        cur.execute(f"""
+            SELECT {select}SUM(p.quantity) FROM {PRODUCTIONS_JOINED}
+            WHERE p.date >= ? AND p.date < ?
+            {group}
+        """, (start, end))
+    rows = cur.fetchall()
+    return [dict(zip((*by, "quantity"), row)) for row in rows if row[-1] is not None]
+
+def get_productions_for_worker(worker_id, limit=10, before=None, after=None):
+    """One page of a worker's entries (by users.id), newest first by date.
+
+    Keyset pagination on (date, id): pass the ``(date, id)`` of the last
+    entry shown as ``before`` for the next older page, or of the first one
+    as ``after`` for the next newer one, so each page costs the same no
+    matter how deep into the history it is.
+    """
+    order = _entry_order_sql("p.date")
+    conn = connect()
+    cur = conn.cursor()
+    if after is not None:
+        cur.execute(f"""
+            SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED}
+            WHERE p.worker_id = ? AND ({order}, p.id) > (?, ?)
+            ORDER BY {order} ASC, p.id ASC LIMIT ?
+        """, (worker_id, after[0] or 0, after[1], limit))
+        rows = cur.fetchall()[::-1]
+    elif before is not None:
+        cur.execute(f"""
+            SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED}
+            WHERE p.worker_id = ? AND ({order}, p.id) < (?, ?)
+            ORDER BY {order} DESC, p.id DESC LIMIT ?
+        """, (worker_id, before[0] or 0, before[1], limit))
+        rows = cur.fetchall()
+    else:
+        cur.execute(f"""
+            SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED}
+            WHERE p.worker_id = ?
+            ORDER BY {order} DESC, p.id DESC LIMIT ?
+        """, (worker_id, limit))
+        rows = cur.fetchall()
+    return [_production_row(row) for row in rows]
+
+def get_production(entry_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f"SELECT {PRODUCTION_COLUMNS} FROM {PRODUCTIONS_JOINED} WHERE p.id = ?", (entry_id,))
+    row = cur.fetchone()
+    return _production_row(row) if row else None
+
+def update_production(entry_id, updates: dict):
+    """Set columns of an entry; a new name or production_type re-resolves its key."""
+    conn = connect()
+    with conn:
+        cur = conn.cursor()
+        for key, value in updates.items():
+            if key == "date":
+                value = to_epoch(value)
+            params = {"value": value, "id": entry_id}
+            if key in _KEY_OF_TEXT:
+                key_column, key_sql = _KEY_OF_TEXT[key]
+                cur.execute(f"""
+                    UPDATE productions SET {key} = :value, {key_column} = {key_sql(":value")}
+                    WHERE id = :id
+                """, params)
+            else:
+                cur.execute(f"UPDATE productions SET {key} = :value WHERE id = :id", params)
 
 def delete_production(entry_id: int):
+    conn = connect()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM productions WHERE id = ?", (entry_id,))
+
+
+# ======================
+# 💬 Bot Sessions
+# ======================
+def load_session(user_id):
+    """The stored JSON for a user's session, or None."""
     conn = connect()
     cur = conn.cursor()
-    cur.execute("DELETE FROM productions WHERE id = ?", (entry_id,))
-    conn.commit()
-    conn.close()
+    cur.execute("SELECT data FROM sessions WHERE user_id = ?", (user_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def save_session(user_id, data: str):
+    conn = connect()
+    with conn:
+        conn.execute("""
+            INSERT INTO sessions (user_id, data, updated) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated = excluded.updated
+        """, (user_id, data, int(time.time())))
+
+def delete_session(user_id):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+def purge_sessions(max_age):
+    """Drop sessions idle for more than ``max_age`` seconds; returns how many."""
+    conn = connect()
+    with conn:
+        cur = conn.execute("DELETE FROM sessions WHERE updated < ?", (int(time.time() - max_age),))
+    return cur.rowcount
+
+
+# ======================
+# ✍️ Group Commit
+# ======================
+# When a shift ends, dozens of workers confirm entries within seconds. The
+# async API does not give each its own transaction: entries go to a single
+# writer thread, which commits whatever arrived within GROUP_COMMIT_WINDOW
+# of the first one in one transaction, synced to disk (synchronous=FULL),
+# and only then resolves each caller's future with its ids. So every
+# handler still gets a durable acknowledgement, but a burst costs one
+# fsync instead of one per entry.
+def commit_productions(groups):
+    """Insert several groups of entries in one transaction; returns their ids, group by group."""
+    conn = connect()
+    with conn:
+        cur = conn.cursor()
+        return [[_insert_production(cur, data) for data in rows] for rows in groups]
+
+
+class ProductionWriter:
+    def __init__(self, window=GROUP_COMMIT_WINDOW, max_rows=GROUP_COMMIT_MAX_ROWS):
+        self.window = window
+        self.max_rows = max_rows
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, rows):
+        """Queue entries to be committed together; the Future resolves to their ids."""
+        future = Future()
+        with self._lock:
+            self._queue.put((list(rows), future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+        return future
+
+    def close(self):
+        """Commit what is queued and stop the thread (a later submit starts a new one)."""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _run(self):
+        connect().execute(f"PRAGMA synchronous = {GROUP_COMMIT_SYNCHRONOUS}")
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, size = [], 0
+            deadline = time.monotonic() + self.window
+            while True:
+                rows, future = item
+                # A caller cancelled before the write began gets no entry
+                if future.set_running_or_notify_cancel():
+                    batch.append(item)
+                    size += len(rows)
+                if size >= self.max_rows:
+                    break
+                try:
+                    # Wait for more only in a burst; a lone entry is committed at once
+                    if len(batch) > 1:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            ids = commit_productions([rows for rows, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad entry must not fail everyone else's: retry one by one
+            for item in batch:
+                self._commit([item])
+            return
+        for (_, future), row_ids in zip(batch, ids):
+            future.set_result(row_ids)
+
+
+production_writer = ProductionWriter()
+
+# ======================
+# ⏱ Query Timings
+# ======================
+# The functions below are wrapped so every call is timed into
+# bot_db_query_seconds and the rows it returned are counted into
+# bot_db_rows_total; the value says how to count them (None: a write).
+# Slow calls are logged as warnings, every call at DEBUG on "db.query".
+def _one(result):
+    return 0 if result is None else 1
+
+def _len(result):
+    return len(result)
+
+TIMED_QUERIES = {
+    "get_user": _one,
+    "get_all_users": _len,
+    "add_user": None,
+    "update_user": None,
+    "delete_user": None,
+    "get_admin_telegram_ids": _len,
+    "get_admin_notify_targets": _len,
+    "add_mold": None,
+    "get_all_molds": _len,
+    "get_molds_catalog": lambda result: len(result[1]),
+    "get_molds_version": _one,
+    "remove_mold": None,
+    "save_production": None,
+    "save_productions": None,
+    "commit_productions": lambda result: sum(map(len, result)),
+    "get_productions": _len,
+    "aggregate_productions": _len,
+    "get_productions_for_worker": _len,
+    "get_production": _one,
+    "update_production": None,
+    "delete_production": None,
+    "rebuild_daily_totals": None,
+    "get_data_version": _one,
+    "load_session": _one,
+    "save_session": None,
+    "delete_session": None,
+    "purge_sessions": None,
+}
+
+
+def _log_query(name, elapsed, rows):
+    if elapsed >= SLOW_QUERY_SECONDS:
+        log.warning("Slow query %s: %.2f s", name, elapsed, extra={"query": name, "rows": rows})
+    elif query_log.isEnabledFor(logging.DEBUG):
+        query_log.debug("%s %.2f ms", name, elapsed * 1000, extra={"query": name, "rows": rows})
+
+
+def _timed(func, count_rows):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.DB_SECONDS.observe(elapsed, name)
+        rows = 0
+        if count_rows is not None:
+            rows = count_rows(result)
+            metrics.DB_ROWS.inc(name, amount=rows)
+        _log_query(name, elapsed, rows)
+        return result
+    return wrapper
+
+
+def _timed_iter(func):
+    """Like _timed for a row generator: only the time spent fetching counts,
+    not what the caller does between rows."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rows, spent = 0, 0.0
+        it = func(*args, **kwargs)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    row = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    spent += time.perf_counter() - start
+                rows += 1
+                yield row
+        finally:
+            it.close()
+            metrics.DB_SECONDS.observe(spent, name)
+            metrics.DB_ROWS.inc(name, amount=rows)
+            _log_query(name, spent, rows)
+    return wrapper
+
+
+for _name, _count_rows in TIMED_QUERIES.items():
+    globals()[_name] = _timed(globals()[_name], _count_rows)
+iter_productions_between = _timed_iter(iter_productions_between)
+
+
+# ======================
+# ⚡ Async API
+# ======================
+# Handlers must not block the event loop, so each function above has an
+# "a"-prefixed coroutine twin that runs it on a small dedicated thread pool.
+# Every pool thread reuses its own pooled connection.
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+def _make_async(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    wrapper.__name__ = wrapper.__qualname__ = "a" + func.__name__
+    return wrapper
+
+
+aget_user = _make_async(get_user)
+aget_all_users = _make_async(get_all_users)
+aadd_user = _make_async(add_user)
+aupdate_user = _make_async(update_user)
+adelete_user = _make_async(delete_user)
+aget_admin_telegram_ids = _make_async(get_admin_telegram_ids)
+aget_admin_notify_targets = _make_async(get_admin_notify_targets)
+
+aadd_mold = _make_async(add_mold)
+aget_all_molds = _make_async(get_all_molds)
+aremove_mold = _make_async(remove_mold)
+aget_molds_catalog = _make_async(get_molds_catalog)
+aget_molds_version = _make_async(get_molds_version)
+adb_changed_marker = _make_async(db_changed_marker)
+
+aget_productions = _make_async(get_productions)
+aget_productions_for_worker = _make_async(get_productions_for_worker)
+aget_production = _make_async(get_production)
+aaggregate_productions = _make_async(aggregate_productions)
+aget_data_version = _make_async(get_data_version)
+aupdate_production = _make_async(update_production)
+adelete_production = _make_async(delete_production)
+
+aload_session = _make_async(load_session)
+asave_session = _make_async(save_session)
+adelete_session = _make_async(delete_session)
+apurge_sessions = _make_async(purge_sessions)
+
+
+# Production inserts do not take a pool thread each: they go through the
+# group-commit writer (see ProductionWriter)
+async def asave_productions(rows):
+    """Insert entries in one transaction; returns their ids once they are on disk."""
+    return await asyncio.wrap_future(production_writer.submit(rows))
+
+
+async def asave_production(data):
+    """Insert one entry; returns its id once it is on disk."""
+    return (await asave_productions([data]))[0]
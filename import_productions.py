@@ -0,0 +1,40 @@
+import argparse
+
+import db
+from importer import ImportFailed, import_productions
+
+# Import historical production entries from a CSV or XLSX file into
+# factory.db. See importer.py for the expected columns.
+#
+#   python import_productions.py eski_yozuvlar.xlsx --add-molds
+parser = argparse.ArgumentParser(description="CSV/XLSX dan ishlab chiqarish yozuvlarini import qilish")
+parser.add_argument("path")
+parser.add_argument("--chunk-size", type=int, default=5000)
+parser.add_argument("--add-molds", action="store_true", help="noma'lum qoliplarni qo‘shish")
+parser.add_argument("--allow-unknown-workers", action="store_true", help="noma'lum ishchi nomlarini qabul qilish")
+parser.add_argument("--dry-run", action="store_true", help="faqat tekshirish, bazaga yozmaslik")
+args = parser.parse_args()
+
+
+def progress(stats):
+    print(f"\r⏳ {stats.read} qator o‘qildi, {stats.inserted} qo‘shildi, "
+          f"{stats.skipped} o‘tkazildi ({stats.elapsed:.0f} s)", end="", flush=True)
+
+
+db.init_db()
+try:
+    stats = import_productions(
+        args.path,
+        chunk_size=args.chunk_size,
+        add_missing_molds=args.add_molds,
+        allow_unknown_workers=args.allow_unknown_workers,
+        dry_run=args.dry_run,
+        progress=progress,
+    )
+except ImportFailed as e:
+    raise SystemExit(f"❌ {e}")
+finally:
+    db.close_all()
+
+print()
+print(("🔎 Tekshiruv (bazaga yozilmadi): " if args.dry_run else "✅ Import tugadi: ") + stats.summary())
@@ -0,0 +1,280 @@
+"""Bulk import of historical production entries from CSV or XLSX files.
+
+Rows are streamed (csv reader / openpyxl read-only mode), validated
+against worker and mold lookups built once up front, and inserted in
+chunks of ``chunk_size`` rows, one executemany transaction per chunk, so
+memory use stays flat no matter how many rows the file has.
+
+Expected columns (header row, any order, case-insensitive; the headers of
+our own Excel reports work too):
+
+    worker:   Ishchi / name / worker / username
+    mold:     Model / Qolip / production_type / mold
+    quantity: Soni / Miqdor / quantity / qty
+    date:     Sana / date
+
+Dates may be Excel dates, epoch seconds or text such as 2023-04-05,
+2023-04-05 14:30 or 05.04.2023 (read as Tashkent time).
+"""
+import csv
+import os
+import re
+import time
+from datetime import datetime
+
+import db
+
+COLUMN_ALIASES = {
+    "worker": ("ishchi", "name", "worker", "username", "ism"),
+    "mold": ("model", "qolip", "production_type", "mold", "qolipturi"),
+    "quantity": ("soni", "miqdor", "quantity", "qty", "dona"),
+    "date": ("sana", "date", "vaqt"),
+}
+MAX_ERROR_SAMPLES = 20
+DATE_CACHE_SIZE = 100_000
+
+
+class ImportFailed(Exception):
+    """The file cannot be imported at all (unknown format, missing columns)."""
+
+
+class ImportStats:
+    __slots__ = ("read", "inserted", "skipped", "added_molds", "errors", "elapsed")
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.added_molds = 0
+        self.errors = []  # first MAX_ERROR_SAMPLES (row number, reason)
+        self.elapsed = 0.0
+
+    def error(self, row_number, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append((row_number, reason))
+
+    def summary(self):
+        text = (
+            f"O‘qildi: {self.read}, qo‘shildi: {self.inserted}, "
+            f"o‘tkazib yuborildi: {self.skipped}"
+        )
+        if self.added_molds:
+            text += f", yangi qoliplar: {self.added_molds}"
+        text += f" ({self.elapsed:.1f} s)"
+        if self.errors:
+            text += "\n" + "\n".join(f"• {n}-qator: {reason}" for n, reason in self.errors)
+            if self.skipped > len(self.errors):
+                text += f"\n… va yana {self.skipped - len(self.errors)} ta"
+        return text
+
+
+# ---------- reading ----------
+def _header_key(text):
+    # "👤 Ishchi" -> "ishchi", "Qolip turi" -> "qolipturi"
+    return re.sub(r"[^\w]|_", "", str(text or "")).casefold() if text else ""
+
+
+def _map_columns(header):
+    keys = [_header_key(h) for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        aliases = {a.replace("_", "") for a in aliases}
+        for i, key in enumerate(keys):
+            if key in aliases:
+                columns[field] = i
+                break
+    missing = [f for f in ("worker", "mold", "quantity") if f not in columns]
+    if missing:
+        raise ImportFailed("Ustunlar topilmadi: " + ", ".join(missing))
+    return columns
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _xlsx_rows(path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # The first sheet holds the entries (also true for our own reports)
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".txt"):
+        return _csv_rows(path)
+    if ext in (".xlsx", ".xlsm"):
+        return _xlsx_rows(path)
+    raise ImportFailed(f"Noma'lum fayl turi: {ext or path} (CSV yoki XLSX kerak)")
+
+
+# ---------- lookups ----------
+def _worker_lookup(allow_unknown):
+    """Map a username or display name (any case) to (users.id, display name).
+
+    Unknown workers, if allowed, come back as (None, name as written).
+    """
+    users = {}
+    for username, info in db.get_all_users().items():
+        # users.name may be NULL; such a worker is matched by username only
+        name = info["name"] or username
+        users[username.casefold()] = (info["id"], name)
+        if info["name"]:
+            users.setdefault(info["name"].casefold(), (info["id"], name))
+
+    def resolve(raw):
+        raw = str(raw or "").strip()
+        if not raw:
+            return None
+        return users.get(raw.casefold()) or ((None, raw) if allow_unknown else None)
+    return resolve
+
+
+def _mold_lookup():
+    """{casefolded name: (molds.id, name)}"""
+    _, molds = db.get_molds_catalog()
+    return {name.casefold(): (mold_id, name) for mold_id, name in molds if name}
+
+
+def _date_parser():
+    """db.to_epoch for one column of dates, tuned for long files.
+
+    Text dates in a file nearly always share one format and repeat a lot,
+    so the format that matched last is tried first and results are memoized.
+    """
+    formats = list(db.LEGACY_DATE_FORMATS)
+    cache = {}
+
+    def parse(value):
+        if not isinstance(value, str):
+            return db.to_epoch(value)
+        text = value.strip()
+        if text in cache:
+            return cache[text]
+        if len(cache) >= DATE_CACHE_SIZE:
+            cache.clear()
+        result = None
+        if text.lstrip("-").isdigit():
+            result = int(text)
+        else:
+            for i, fmt in enumerate(formats):
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                except ValueError:
+                    continue
+                if i:
+                    formats.insert(0, formats.pop(i))
+                result = db.to_epoch(parsed)
+                break
+        cache[text] = result
+        return result
+    return parse
+
+
+def _quantity(value):
+    if isinstance(value, (int, float)) and value == int(value):
+        value = int(value)
+    elif isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    else:
+        return None
+    return value if value > 0 else None
+
+
+# ---------- import ----------
+def import_productions(path, chunk_size=5000, add_missing_molds=False,
+                       allow_unknown_workers=False, dry_run=False, progress=None):
+    """Import ``path`` into productions; returns ImportStats.
+
+    ``progress(stats)`` is called after every chunk. Rows with unknown
+    workers or molds, bad quantities or dates are skipped and counted.
+    With ``dry_run`` nothing is written.
+    """
+    start = time.monotonic()
+    stats = ImportStats()
+    rows = iter_rows(path)
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFailed("Fayl bo‘sh")
+    columns = _map_columns(header)
+    worker_col, mold_col, qty_col = columns["worker"], columns["mold"], columns["quantity"]
+    date_col = columns.get("date")
+    width = max(columns.values()) + 1
+
+    worker_of = _worker_lookup(allow_unknown_workers)
+    molds = _mold_lookup()
+    date_of = _date_parser()
+    now = int(time.time())
+
+    conn = db.connect()
+    chunk = []
+
+    def flush():
+        if chunk and not dry_run:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO productions (worker_id, name, mold_id, production_type, quantity, date)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    chunk
+                )
+        stats.inserted += len(chunk)
+        chunk.clear()
+        stats.elapsed = time.monotonic() - start
+        if progress:
+            progress(stats)
+
+    for row_number, row in enumerate(rows, start=2):
+        if not row or all(v is None or str(v).strip() == "" for v in row):
+            continue
+        stats.read += 1
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+
+        worker = worker_of(row[worker_col])
+        if worker is None:
+            stats.error(row_number, f"ishchi topilmadi: {row[worker_col]!r}")
+            continue
+
+        raw_mold = str(row[mold_col] or "").strip()
+        mold = molds.get(raw_mold.casefold())
+        if mold is None:
+            if not raw_mold or not add_missing_molds:
+                stats.error(row_number, f"qolip topilmadi: {raw_mold!r}")
+                continue
+            mold_id = db.add_mold(raw_mold) if not dry_run else None
+            mold = molds[raw_mold.casefold()] = (mold_id, raw_mold)
+            stats.added_molds += 1
+
+        quantity = _quantity(row[qty_col])
+        if quantity is None:
+            stats.error(row_number, f"miqdor xato: {row[qty_col]!r}")
+            continue
+
+        if date_col is None:
+            date = now
+        else:
+            date = date_of(row[date_col])
+            if date is None:
+                stats.error(row_number, f"sana xato: {row[date_col]!r}")
+                continue
+
+        chunk.append((*worker, *mold, quantity, date))
+        if len(chunk) >= chunk_size:
+            flush()
+
+    flush()
+    return stats
@@ -0,0 +1,139 @@
+"""Logging setup: level-gated, queue-backed, plain text or JSON, with sampling.
+
+Modules log through the standard library with %-style arguments, so
+nothing is formatted unless the level is enabled:
+
+    log = logging.getLogger("bot")
+    log.debug("report %s sent", key, extra={"user_id": uid})
+
+Fields passed in ``extra`` become structured fields: ``key=value`` pairs in
+text output, keys of the object in JSON output.
+
+``setup()`` puts a QueueHandler on the root logger. The event loop only
+merges a record's arguments and enqueues it; a background thread
+(QueueListener) formats the line and writes it, so a slow stderr or log
+drain never blocks a handler. ``shutdown()`` drains the queue.
+
+Settings come from the environment:
+
+    LOG_LEVEL   root level, then optional per-logger levels, e.g.
+                "WARNING,db=DEBUG,bot.updates=DEBUG"; the default, DEFAULT_LEVEL,
+                keeps aiogram's and aiohttp's one-line-per-update INFO records out
+    LOG_FORMAT  "text" (default) or "json" (one object per line)
+    LOG_SAMPLE  keep rates for chatty loggers, e.g. "db.query=0.01,bot.updates=0.1";
+                only DEBUG/INFO records are sampled, warnings and errors are always kept
+
+Loggers used: bot, bot.updates (one record per update, DEBUG), db,
+db.query (one record per query, DEBUG), notifier, webhook, plus aiogram's own.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+DEFAULT_LEVEL = "INFO,aiogram.event=WARNING,aiohttp.access=WARNING"
+
+_listener = None
+
+
+def _extra_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+def _timestamp(record):
+    return datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{_timestamp(record)} {record.levelname} {record.name}: {record.getMessage()}"
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": _timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Keep a ``rate`` share of a logger's DEBUG/INFO records."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Merge the arguments now, while they still hold what was logged,
+        # but leave the formatting (timestamps, JSON, tracebacks) to the
+        # listener thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+
+def _pairs(spec):
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if item:
+            name, _, value = item.rpartition("=")
+            yield name.strip(), value.strip()
+
+
+def setup(level=None, fmt=None, sample=None, stream=None):
+    """Route all logging through the queue; arguments default to the environment."""
+    global _listener
+    if _listener is not None:
+        return
+    level = level if level is not None else os.getenv("LOG_LEVEL", DEFAULT_LEVEL)
+    fmt = fmt if fmt is not None else os.getenv("LOG_FORMAT", "text")
+    sample = sample if sample is not None else os.getenv("LOG_SAMPLE", "")
+
+    root = logging.getLogger()
+    for name, value in _pairs(level):
+        (logging.getLogger(name) if name else root).setLevel(value.upper())
+    for name, value in _pairs(sample):
+        logging.getLogger(name).addFilter(SampleFilter(float(value)))
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    root.handlers[:] = [_QueueHandler(records)]
+    _listener = QueueListener(records, output)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Write out everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
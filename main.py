@@ -1,44 +1,76 @@
 import asyncio
-from aiogram import Bot, Dispatcher, F
-from aiogram.enums import ParseMode
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.filters import Command
 from aiogram.types import (
-    Message, FSInputFile,
-    InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, ReplyKeyboardRemove
+    Message, CallbackQuery, FSInputFile,
+    InlineKeyboardButton, InlineKeyboardMarkup,
+    KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 )
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-from aiogram.filters import Command
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from aiogram.client.default import DefaultBotProperties
+from dotenv import load_dotenv
 
 import db
-from datetime import datetime
-import pandas as pd
-from collections import defaultdict
-import calendar
-
-# Initialize DB
-try:
-    db.init_db()
-except Exception:
-    pass  # Prevent crash if already initialized
-
-import os
-from dotenv import load_dotenv
-from aiogram import Bot, Dispatcher
+import logs
+import metrics
+import monitoring
+from report_cache import ReportCache
+from mold_catalog import MoldCatalog
+from notifier import Notifier
+from render_service import RenderBusy, RenderService
+from sessions import MemorySessionBackend, SessionStore, SqliteSessionBackend
+from state_router import StateRouter
+
+# The report builders (openpyxl) are imported on first use, or pre-warmed
+# in the background once the bot has started; see on_startup.
 
 # 📂 Load .env variables
 load_dotenv()
 
+log = logging.getLogger("bot")
+
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN is missing! Check your .env file.")
 
+# BOT_MODE=webhook serves updates over HTTP instead of polling; see webhook.py
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
+router = StateRouter()
+monitoring.setup(dp)
+
+# 📈 Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics (off unless METRICS_PORT is set)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
-# Your handlers below...
-user_sessions = {}
+# Uzbekistan timezone (UTC+5, no DST)
+UZB_TZ = db.LOCAL_TZ
+
+# 💬 Sessions: recently active ones in memory, all of them in the database
+# (SESSION_BACKEND=memory keeps them in this process only). Webhook mode may
+# run several processes, so there every update re-reads its session.
+SESSION_MAX_AGE = 30 * 24 * 3600  # seconds of inactivity before a stored session is dropped
+if os.getenv("SESSION_BACKEND", "sqlite") == "memory":
+    user_sessions = SessionStore(MemorySessionBackend())
+else:
+    user_sessions = SessionStore(SqliteSessionBackend(), shared=BOT_MODE == "webhook")
+
+mold_catalog = MoldCatalog()
+
+# 📢 Admin alerts are sent in the background; admins in digest mode get
+# one message per DIGEST_SIZE entries or DIGEST_SECONDS, whichever is first
+DIGEST_SIZE = 20
+DIGEST_SECONDS = 300
+notifier = Notifier(digest_size=DIGEST_SIZE, digest_interval=DIGEST_SECONDS)
 
 # ================== Keyboards ==================
 def main_menu(session: dict):
@@ -54,7 +86,9 @@ def main_menu(session: dict):
         kb.button(text="➕ Qolip Qo‘shish")
         kb.button(text="🗑 Qolip O‘chirish")
         kb.button(text="📋 Qoliplar")
-        kb.adjust(2, 2, 3)
+        kb.button(text="🔔 Bildirishnomalar")
+        kb.button(text="📥 Import")
+        kb.adjust(2, 2, 2, 2, 1)
     else:
         # Worker actions
         kb.button(text="➕ Ishlab chiqarishni Qo‘shish")
@@ -69,46 +103,43 @@ def main_menu(session: dict):
     return kb.as_markup(resize_keyboard=True)
 
 
-def molds_reply_keyboard(include_cancel=True):
-    molds = db.get_all_molds()
-    builder = ReplyKeyboardBuilder()
-
-    # Safe handling whether molds are dicts or plain strings
-    for m in molds:
-        if isinstance(m, dict):
-            builder.button(text=m.get("name", "❓ No Name"))
-        else:
-            builder.button(text=str(m))
+@dp.message(Command("start"))
+async def cmd_start(msg: Message):
+    user_sessions.new(msg.from_user.id, state="awaiting_username")
+    await user_sessions.flush(msg.from_user.id)
+    await msg.answer("Xush kelibsiz! Iltimos, foydalanuvchi nomingizni kiriting:")
 
-    if include_cancel:
-        builder.button(text="❌ Bekor qilish")
 
-    # Adjust: 2 per row for molds, last row for cancel
-    total_molds = len(molds)
-    if include_cancel:
-        builder.adjust(2, 2, *((total_molds + 1) % 2 and (1,) or ()))
-    else:
-        builder.adjust(2, 2)
+# Every other message and callback goes through the state router
+@dp.message()
+async def route_message(msg: Message):
+    async with user_sessions.active(msg.from_user.id) as sess:
+        handler = router.resolve_message(sess.get("state") if sess else None, msg.text)
+        metrics.HANDLER_LABEL.set(handler.__name__)
+        await handler(msg)
 
-    return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
+@dp.callback_query()
+async def route_callback(call: CallbackQuery):
+    handler = router.resolve_callback(call.data)
+    if handler is None:
+        return await call.answer()
+    metrics.HANDLER_LABEL.set(handler.__name__)
+    async with user_sessions.active(call.from_user.id):
+        await handler(call)
 
-@dp.message(Command("start"))
-async def cmd_start(msg: Message):
-    user_sessions[msg.from_user.id] = {"state": "awaiting_username"}
-    await msg.answer("Xush kelibsiz! Iltimos, foydalanuvchi nomingizni kiriting:")
 
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_username")
+@router.state("awaiting_username", exclusive=True)
 async def get_username(msg: Message):
     sess = user_sessions[msg.from_user.id]
     sess["username"] = msg.text.strip()
     sess["state"] = "awaiting_password"
     await msg.answer("Parolingizni kiriting:")
 
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_password")
+@router.state("awaiting_password", exclusive=True)
 async def get_password(msg: Message):
     sess = user_sessions[msg.from_user.id]
-    user = db.get_user(sess["username"])
+    user = await db.aget_user(sess["username"])
     if not user or user["password"] != msg.text.strip():
         user_sessions.pop(msg.from_user.id, None)
         return await msg.answer("Kirish amalga oshmadi. Qayta urinib ko‘rish uchun /start buyrug‘idan foydalaning.")
@@ -117,25 +148,43 @@ async def get_password(msg: Message):
         return await msg.answer("Siz bloklangansiz.")
     sess.update({
         "is_admin": user["is_admin"],
-        "name": user["name"],
+        "name": user["name"] or user["username"],
+        "worker_id": user["id"],
         "state": "logged_in"
     })
-    db.update_user(sess["username"], {"telegram_id": msg.from_user.id})
+    await db.aupdate_user(sess["username"], {"telegram_id": msg.from_user.id})
     await msg.answer(
         f"<b>{sess['name']}</b> sifatida tizimga kirdingiz ({'Admin' if sess['is_admin'] else 'Ishchi'})",
         reply_markup=main_menu(sess)
     )
 
 
+def logged_in(sess):
+    """Whether ``sess`` belongs to a user who got past the password check."""
+    return sess is not None and "name" in sess
+
+
+async def worker_id(sess):
+    """The logged-in user's users.id, or None if ``sess`` is not logged in.
+
+    get_password sets it; sessions saved before it was kept look it up by
+    their username, which the login has verified.
+    """
+    if not logged_in(sess):
+        return None
+    if "worker_id" not in sess:
+        user = await db.aget_user(sess["username"])
+        sess["worker_id"] = user["id"] if user else None
+    return sess.get("worker_id")
+
+
 # ➕ Admin: Create Worker
 # ➕ Start Create User
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
-
-@dp.message(F.text == "➕ Foydalanuvchi Qo‘shish")
+@router.button("➕ Foydalanuvchi Qo‘shish")
 async def create_user_start(msg: Message):
-    sess = user_sessions[msg.from_user.id]
-    if not sess.get("is_admin"):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
         return await msg.answer("🚫 Ruxsat berilmagan.")
 
     sess["state"] = "creating_user_name"
@@ -152,11 +201,10 @@ async def create_user_start(msg: Message):
 
 
 # 📛 1-qadam — To‘liq ismni kiriting
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "creating_user_name")
+@router.state("creating_user_name")
 async def creating_username(msg: Message):
-    if msg.text.strip().lower() == "cancel" or msg.text.strip() == "❌ Bekor qilish":
-        user_sessions[msg.from_user.id]["state"] = "logged_in"
-        return await msg.answer("❌ Foydalanuvchi yaratish bekor qilindi.", reply_markup=main_menu(user_sessions[msg.from_user.id]))
+    if msg.text.strip().lower() == "cancel":
+        return await cancel(msg)
 
     sess = user_sessions[msg.from_user.id]
     sess["new_user_name"] = msg.text.strip()
@@ -165,11 +213,10 @@ async def creating_username(msg: Message):
 
 
 # 👤 2-qadam — Foydalanuvchi nomini kiriting
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "creating_user_username")
+@router.state("creating_user_username")
 async def creating_password(msg: Message):
-    if msg.text.strip().lower() == "cancel" or msg.text.strip() == "❌ Bekor qilish":
-        user_sessions[msg.from_user.id]["state"] = "logged_in"
-        return await msg.answer("❌ Foydalanuvchi yaratish bekor qilindi.", reply_markup=main_menu(user_sessions[msg.from_user.id]))
+    if msg.text.strip().lower() == "cancel":
+        return await cancel(msg)
 
     sess = user_sessions[msg.from_user.id]
     sess["new_user_username"] = msg.text.strip()
@@ -179,15 +226,14 @@ async def creating_password(msg: Message):
 
 
 # 🔑 3-qadam — Foydalanuvchini yaratishni yakunlash
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "creating_user_password")
+@router.state("creating_user_password")
 async def finish_creating_user(msg: Message):
-    if msg.text.strip().lower() == "cancel" or msg.text.strip() == "❌ Bekor qilish":
-        user_sessions[msg.from_user.id]["state"] = "logged_in"
-        return await msg.answer("❌ Foydalanuvchi yaratish bekor qilindi.", reply_markup=main_menu(user_sessions[msg.from_user.id]))
+    if msg.text.strip().lower() == "cancel":
+        return await cancel(msg)
 
     sess = user_sessions[msg.from_user.id]
     password = msg.text.strip()
-    db.add_user(
+    await db.aadd_user(
         username=sess["new_user_username"],
         password=password,
         name=sess["new_user_name"],
@@ -196,31 +242,16 @@ async def finish_creating_user(msg: Message):
     sess["state"] = "logged_in"
     await msg.answer("✅ Yangi ishchi muvaffaqiyatli qo‘shildi!", reply_markup=main_menu(sess))
 
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-
 CANCEL_BUTTON = KeyboardButton(text="❌ Bekor qilish")
 CONFIRM_BUTTON = KeyboardButton(text="✅ Tasdiqlash")
 
 
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime
-
-from pytz import timezone
-
-# Uzbekistan timezone
-UZB_TZ = timezone("Asia/Tashkent")
-
-
 # =========================
 # =========================
 # 📦 Add Production Flow
 # =========================
 
 # Worker - Start adding production
-from aiogram import F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-from datetime import datetime
-import db
 
 # Example constants (make sure you have them somewhere in your code)
 
@@ -228,39 +259,109 @@ import db
 # Example global storage for sessions
 
 
+# ========== MOLD PICKER ==========
+# Flows that ask for a mold share one inline picker. A flow registers,
+# with @mold_pick, the session state it waits in and what to do with the
+# chosen name; typed text either names a mold exactly or filters the
+# picker by prefix.
+MOLD_PICKS = {}       # purpose -> (state, handler)
+PICK_PURPOSES = {}    # state -> purpose
+MOLD_TEXT_HOOKS = {}  # purpose -> handler(msg, sess, molds, text) tried before prefix search
+
+
+async def send_mold_picker(msg: Message, sess, purpose, prompt):
+    """Show the first page of all molds; False if there are none."""
+    kb = (await mold_catalog.snapshot()).picker(purpose)
+    if kb is None:
+        return False
+    sess.pop("mold_query", None)
+    await msg.answer(f"{prompt}\n🔎 Yoki qolip nomining bosh harflarini yozing.", reply_markup=kb)
+    return True
+
+
+async def mold_typed(msg: Message):
+    sess = user_sessions[msg.from_user.id]
+    purpose = PICK_PURPOSES[sess["state"]]
+    molds = await mold_catalog.snapshot()
+    text = msg.text.strip()
+    if text in molds:
+        return await MOLD_PICKS[purpose][1](msg, sess, text)
+
+    hook = MOLD_TEXT_HOOKS.get(purpose)
+    if hook and await hook(msg, sess, molds, text):
+        return
+
+    kb = molds.picker(purpose, text)
+    if kb is None:
+        return await msg.answer("❌ Bunday qolip topilmadi. Boshqa harflarni kiriting:")
+    sess["mold_query"] = text
+    await msg.answer(f"🔎 «{text}» bilan boshlanadigan qoliplar:", reply_markup=kb)
+
+
+def mold_pick(purpose, state):
+    """Register the handler(msg, sess, name) for a mold chosen while in ``state``."""
+    def register(handler):
+        MOLD_PICKS[purpose] = (state, handler)
+        PICK_PURPOSES[state] = purpose
+        router.state(state)(mold_typed)
+        return handler
+    return register
+
+
+@router.callback("mold")
+async def mold_chosen(call: CallbackQuery):
+    _, purpose, mold_id = call.data.split(":")
+    sess = user_sessions.get(call.from_user.id)
+    state, handler = MOLD_PICKS.get(purpose, (None, None))
+    if not sess or handler is None or sess.get("state") != state:
+        return await call.answer("Kutilmagan qadam.")
+
+    name = (await mold_catalog.snapshot()).by_id.get(int(mold_id))
+    if name is None:
+        return await call.answer("❌ Bu qolip endi mavjud emas.")
+    await call.answer()
+    await handler(call.message, sess, name)
+
+
+@router.callback("molds")
+async def mold_page(call: CallbackQuery):
+    _, purpose, page = call.data.split(":")
+    sess = user_sessions.get(call.from_user.id)
+    if not sess or purpose not in MOLD_PICKS:
+        return await call.answer()
+
+    kb = (await mold_catalog.snapshot()).picker(purpose, sess.get("mold_query") or "", int(page))
+    if kb is None:
+        return await call.answer("Qoliplar topilmadi.")
+    await call.message.edit_reply_markup(reply_markup=kb)
+    await call.answer()
+
+
 # ========== ADD PRODUCTION FLOW ==========
 
-@dp.message(F.text == "➕ Ishlab chiqarishni Qo‘shish")
+@router.button("➕ Ishlab chiqarishni Qo‘shish")
 async def add_prod(msg: Message):
-    sess = user_sessions[msg.from_user.id]
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
+
     sess["state"] = "awaiting_prod_type"
 
-    molds = db.get_all_molds()  # returns list of strings
-    if not molds:
+    prompt = (
+        "Ishlab chiqarish qolip turini tanlang.\n"
+        "📦 Bir nechta yozuv uchun har qatorga «qolip miqdor» yozib yuboring."
+    )
+    if not await send_mold_picker(msg, sess, "prod", prompt):
         sess["state"] = "logged_in"
         return await msg.answer(
             "❌ Hozircha qoliplar mavjud emas. Admin qo‘shishi kerak.",
             reply_markup=main_menu(sess)
         )
 
-    kb = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=m)] for m in molds] + [[CANCEL_BUTTON]],
-        resize_keyboard=True
-    )
-    await msg.answer("Ishlab chiqarish qolip turini tanlang:", reply_markup=kb)
-
-
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_prod_type")
-async def prod_type(msg: Message):
-    if msg.text == "❌ Bekor qilish":
-        return await cancel_prod(msg)
-
-    molds = db.get_all_molds()  # list of strings
-    if msg.text not in molds:
-        return await msg.answer("❌ Iltimos, ro‘yxatdan qolip tanlang.")
 
-    sess = user_sessions[msg.from_user.id]
-    sess["production_type"] = msg.text.strip()
+@mold_pick("prod", "awaiting_prod_type")
+async def prod_type(msg: Message, sess, name):
+    sess["production_type"] = name
     sess["state"] = "awaiting_quantity"
 
     await msg.answer("Miqdorni kiriting:", reply_markup=ReplyKeyboardMarkup(
@@ -270,11 +371,65 @@ async def prod_type(msg: Message):
 
 
 
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_quantity")
-async def prod_qty(msg: Message):
-    if msg.text == "❌ Bekor qilish":
-        return await cancel_prod(msg)
+# 📦 Batch entry: one "mold quantity" line per entry, confirmed and saved at once
+BATCH_MAX_LINES = 50
+BATCH_LINE = re.compile(r"^(.*\S)\s+[x×*]?(\d+)$")
+
+
+def parse_batch(text, molds):
+    """([(mold, qty), ...], [bad lines]) for a "mold quantity" per line message."""
+    items, bad = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        m = BATCH_LINE.match(line)
+        name = molds.lookup(m.group(1).rstrip(" :-–—")) if m else None
+        if name is None or int(m.group(2)) <= 0:
+            bad.append(line)
+        else:
+            items.append((name, int(m.group(2))))
+    return items, bad
+
+
+def mold_text(purpose):
+    def register(hook):
+        MOLD_TEXT_HOOKS[purpose] = hook
+        return hook
+    return register
+
+
+@mold_text("prod")
+async def prod_batch(msg: Message, sess, molds, text):
+    items, bad = parse_batch(text, molds)
+    if not items and len(text.splitlines()) == 1:
+        return False  # a single line that is not "mold quantity" is a name prefix
+    if bad:
+        await msg.answer(
+            "❌ Quyidagi qatorlar tushunilmadi (qolip nomi yoki miqdor xato):\n"
+            + "\n".join(f"• {line}" for line in bad[:20])
+        )
+        return True
+    if len(items) > BATCH_MAX_LINES:
+        await msg.answer(f"❌ Bir xabarda ko‘pi bilan {BATCH_MAX_LINES} ta qator yuboring.")
+        return True
+
+    sess["batch"] = [list(item) for item in items]
+    sess["state"] = "confirming_batch"
+    await msg.answer(
+        f"Tasdiqlang ({len(items)} ta yozuv):\n"
+        + "\n".join(f"• {name} — {qty}" for name, qty in items)
+        + f"\nJami: {sum(qty for _, qty in items)} dona",
+        reply_markup=ReplyKeyboardMarkup(
+            keyboard=[[CONFIRM_BUTTON, CANCEL_BUTTON]],
+            resize_keyboard=True
+        )
+    )
+    return True
 
+
+@router.state("awaiting_quantity")
+async def prod_qty(msg: Message):
     if not msg.text.isdigit():
         return await msg.answer("❌ Miqdor faqat raqam bo‘lishi kerak.")
 
@@ -291,9 +446,13 @@ async def prod_qty(msg: Message):
     )
 
 
-@dp.message(F.text == "✅ Tasdiqlash")
+@router.button("✅ Tasdiqlash")
 async def confirm_prod(msg: Message):
-    sess = user_sessions[msg.from_user.id]
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
+    if sess.get("state") == "confirming_batch":
+        return await confirm_batch(msg, sess)
     if sess.get("state") != "confirming":
         return await msg.answer("Kutilmagan qadam.")
 
@@ -302,12 +461,15 @@ async def confirm_prod(msg: Message):
 
     now_uzb = datetime.now(UZB_TZ)
 
-    db.save_production({
+    # Returns once the entry is committed to disk
+    entry_id = await db.asave_production({
         "name": sess["name"],
         "production_type": sess["production_type"],
         "quantity": sess["quantity"],
-        "date": now_uzb.strftime("%Y-%m-%d %H:%M:%S")
+        "date": now_uzb,
+        "worker_id": await worker_id(sess)
     })
+    log.debug("Entry %d saved", entry_id, extra={"user_id": msg.from_user.id})
 
     alert_text = (
         f"📢 Yangi ishlab chiqarish yozuvi\n"
@@ -319,42 +481,175 @@ async def confirm_prod(msg: Message):
     )
 
     sess["state"] = "logged_in"
-    sess.pop("production_type", None)
-    sess.pop("quantity", None)
+    production_type = sess.pop("production_type", None)
+    quantity = sess.pop("quantity", None)
 
     await msg.answer("✅ Saqlandi!", reply_markup=main_menu(sess))
 
-    admins = [uid for uid, data in user_sessions.items() if data.get("is_admin")]
-    for admin_id in admins:
+    digest_line = f"👤 {sess['name']} — {production_type} × {quantity} ({now_uzb.strftime('%H:%M')})"
+    notifier.notify_many(await db.aget_admin_notify_targets(), alert_text, [digest_line])
+
+
+async def confirm_batch(msg: Message, sess):
+    items = sess.get("batch")
+    if not items:
+        return await msg.answer("❌ Ma'lumotlar to‘liq emas. Iltimos, qaytadan boshlang.")
+
+    now_uzb = datetime.now(UZB_TZ)
+    user_id = await worker_id(sess)
+    await db.asave_productions([
+        {"name": sess["name"], "production_type": name, "quantity": qty, "date": now_uzb, "worker_id": user_id}
+        for name, qty in items
+    ])
+
+    alert_text = (
+        f"📢 {len(items)} ta yangi ishlab chiqarish yozuvi\n"
+        f"👤 Ishchi: {sess['name']}\n"
+        f"🆔 Foydalanuvchi nomi: @{msg.from_user.username or 'N/A'}\n"
+        + "".join(f"🚗 {name} — 📦 {qty}\n" for name, qty in items)
+        + f"🕒 Vaqt: {now_uzb.strftime('%Y-%m-%d %H:%M')}"
+    )
+
+    sess.pop("batch", None)
+    sess["state"] = "logged_in"
+    await msg.answer(f"✅ {len(items)} ta yozuv saqlandi!", reply_markup=main_menu(sess))
+
+    time_str = now_uzb.strftime('%H:%M')
+    digest_lines = [f"👤 {sess['name']} — {name} × {qty} ({time_str})" for name, qty in items]
+    notifier.notify_many(await db.aget_admin_notify_targets(), alert_text, digest_lines)
+
+
+# 📥 Admin: import historical entries from an uploaded CSV/XLSX file
+IMPORT_MAX_BYTES = 20 * 1024 * 1024  # Bot API download limit
+IMPORT_PROGRESS_EVERY = 3.0  # seconds between progress message edits
+import_lock = asyncio.Lock()
+
+
+@router.button("📥 Import")
+async def import_start(msg: Message):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
+        return await msg.answer("❌ Sizda ruxsat yo‘q.")
+
+    sess["state"] = "awaiting_import"
+    await msg.answer(
+        "📥 CSV yoki XLSX faylni yuboring.\n"
+        "Ustunlar: Ishchi, Model, Soni, Sana (sarlavha qatori bilan).",
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[CANCEL_BUTTON]], resize_keyboard=True)
+    )
+
+
+@router.state("awaiting_import", media=True)
+async def import_file(msg: Message):
+    import importer
+
+    doc = msg.document
+    if doc is None:
+        return await msg.answer("📎 Iltimos, faylni hujjat sifatida yuboring.")
+    ext = os.path.splitext(doc.file_name or "")[1].lower()
+    if ext not in (".csv", ".txt", ".xlsx", ".xlsm"):
+        return await msg.answer("❌ Faqat CSV yoki XLSX fayl qabul qilinadi.")
+    if doc.file_size and doc.file_size > IMPORT_MAX_BYTES:
+        return await msg.answer("❌ Fayl juda katta (20 MB dan oshmasin). Katta fayllar uchun import_productions.py dan foydalaning.")
+    if import_lock.locked():
+        return await msg.answer("⏳ Boshqa import hali tugamagan, biroz kuting.")
+
+    sess = user_sessions[msg.from_user.id]
+    async with import_lock:
+        status = await msg.answer("⏳ Fayl yuklanmoqda...")
+        fd, path = tempfile.mkstemp(suffix=ext)
+        os.close(fd)
         try:
-            await bot.send_message(admin_id, alert_text)
-        except Exception as e:
-            print(f"Admin {admin_id} ga xabar yuborilmadi: {e}")
+            await msg.bot.download(doc, destination=path)
+
+            loop = asyncio.get_running_loop()
+            last_edit = [0.0]
+
+            async def show(text):
+                try:
+                    await status.edit_text(text)
+                except Exception:
+                    pass  # a missed progress update does not matter
+
+            def progress(stats):
+                # Runs in the import thread; throttled, fire-and-forget edits
+                now = loop.time()
+                if now - last_edit[0] >= IMPORT_PROGRESS_EVERY:
+                    last_edit[0] = now
+                    text = f"⏳ {stats.read} qator o‘qildi, {stats.inserted} qo‘shildi, {stats.skipped} o‘tkazildi"
+                    asyncio.run_coroutine_threadsafe(show(text), loop)
+
+            try:
+                stats = await asyncio.to_thread(importer.import_productions, path, progress=progress)
+            except importer.ImportFailed as e:
+                return await msg.answer(f"❌ {e}")
+            except Exception as e:
+                # Corrupt workbook, wrong encoding, ...
+                return await msg.answer(f"❌ Faylni o‘qib bo‘lmadi: {e}")
+        finally:
+            os.remove(path)
+
+    # A new message, not an edit: a late progress edit must not overwrite it
+    sess["state"] = "logged_in"
+    await msg.answer("✅ Import tugadi.\n" + stats.summary(), reply_markup=main_menu(sess))
+
+
+# 🔔 Admin: one alert per entry, or a digest
+@router.button("🔔 Bildirishnomalar")
+async def toggle_digest(msg: Message):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
+        return await msg.answer("❌ Sizda ruxsat yo‘q.")
+
+    user = await db.aget_user(sess["username"])
+    digest = not user["notify_digest"]
+    await db.aupdate_user(sess["username"], {"notify_digest": int(digest)})
+    if digest:
+        text = (f"🗂 Yangi yozuvlar jamlanib yuboriladi: har {DIGEST_SIZE} ta yozuvda "
+                f"yoki {DIGEST_SECONDS // 60} daqiqada bir marta.")
+    else:
+        text = "🔔 Har bir yangi yozuv alohida yuboriladi."
+    await msg.answer(text, reply_markup=main_menu(sess))
+
 
+# ❌ Bekor qilish — leaves whatever flow the user is in
+FLOW_KEYS = ("production_type", "quantity", "batch", "editing", "mold_query", "new_user_name", "new_user_username")
 
-@dp.message(F.text == "❌ Bekor qilish")
-async def cancel_prod(msg: Message):
-    sess = user_sessions.get(msg.from_user.id, {})
-    for key in ["state", "production_type", "quantity"]:
+
+def end_flow(sess):
+    for key in FLOW_KEYS:
         sess.pop(key, None)
     sess["state"] = "logged_in"
+
+
+@router.button("❌ Bekor qilish")
+async def cancel(msg: Message):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
+
+    end_flow(sess)
     await msg.answer("Bekor qilindi.", reply_markup=main_menu(sess))
 
-# =========================
-# 🛠 Mold Management (Admin)
-# =========================
 
-from aiogram import F
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+@router.callback("cancel")
+async def cancel_inline(call: CallbackQuery):
+    sess = user_sessions.get(call.from_user.id)
+    if not logged_in(sess):
+        return await call.answer("⚠️ Siz tizimga kirmagansiz.")
+
+    end_flow(sess)
+    await call.message.answer("Bekor qilindi.", reply_markup=main_menu(sess))
+    await call.answer()
 
 # =========================
 # 🛠 Mold Management (Admin)
 # =========================
 
-@dp.message(F.text.regexp(r"^➕\s*Qolip\s+Qo['‘`ʼ]shish$"))
+@router.button("➕ Qolip Qo‘shish")
 async def add_mold_start(msg: Message):
-    sess = user_sessions[msg.from_user.id]
-    if not sess.get("is_admin"):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
         return await msg.answer("❌ Sizda ruxsat yo‘q.")
     sess["state"] = "awaiting_new_mold"
     await msg.answer(
@@ -366,64 +661,52 @@ async def add_mold_start(msg: Message):
     )
 
 
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_new_mold")
+@router.state("awaiting_new_mold")
 async def add_mold_finish(msg: Message):
-    if msg.text == "❌ Bekor qilish":
-        return await cancel_prod(msg)
-
     mold_name = msg.text.strip()
     if not mold_name:
         return await msg.answer("❌ Qolip nomi bo‘sh bo‘lishi mumkin emas.")
 
     # Check if mold already exists
-    if mold_name in db.get_all_molds():
+    if mold_name in await mold_catalog.snapshot():
         return await msg.answer("⚠️ Bu qolip allaqachon mavjud.")
 
-    db.add_mold(mold_name)
+    await db.aadd_mold(mold_name)
+    mold_catalog.invalidate()
     sess = user_sessions[msg.from_user.id]
     sess["state"] = "logged_in"
     await msg.answer(f"✅ Qolip qo‘shildi: {mold_name}", reply_markup=main_menu(sess))
 
 
-@dp.message(F.text.regexp(r"^🗑\s*Qolip\s+O['‘`ʼ]chirish$"))
+@router.button("🗑 Qolip O‘chirish")
 async def remove_mold_start(msg: Message):
-    sess = user_sessions[msg.from_user.id]
-    if not sess.get("is_admin"):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
         return await msg.answer("❌ Sizda ruxsat yo‘q.")
 
-    molds = db.get_all_molds()
-    if not molds:
+    if not await send_mold_picker(msg, sess, "remove", "🗑 O‘chirmoqchi bo‘lgan qolipni tanlang:"):
         return await msg.answer("❌ Qoliplar mavjud emas.")
-
-    kb = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=m)] for m in molds] + [[CANCEL_BUTTON]],
-        resize_keyboard=True
-    )
     sess["state"] = "awaiting_remove_mold"
-    await msg.answer("🗑 O‘chirmoqchi bo‘lgan qolipni tanlang:", reply_markup=kb)
 
 
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "awaiting_remove_mold")
-async def remove_mold_finish(msg: Message):
-    if msg.text == "❌ Bekor qilish":
-        return await cancel_prod(msg)
-
-    mold_name = msg.text.strip()
-    if mold_name not in db.get_all_molds():
-        return await msg.answer("❌ Bunday qolip topilmadi.")
-
-    db.remove_mold(mold_name)
-    sess = user_sessions[msg.from_user.id]
+@mold_pick("remove", "awaiting_remove_mold")
+async def remove_mold_finish(msg: Message, sess, mold_name):
+    await db.aremove_mold(mold_name)
+    mold_catalog.invalidate()
+    sess.pop("mold_query", None)
     sess["state"] = "logged_in"
     await msg.answer(f"🗑 Qolip o‘chirildi: {mold_name}", reply_markup=main_menu(sess))
 
 
-@dp.message(F.text == "📋 Qoliplar")
+@router.button("📋 Qoliplar")
 async def show_molds(msg: Message):
-    molds = db.get_all_molds()
+    if not logged_in(user_sessions.get(msg.from_user.id)):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
+
+    molds = await mold_catalog.snapshot()
     if not molds:
         return await msg.answer("❌ Qoliplar mavjud emas.")
-    await msg.answer("📋 Hozirgi qoliplar:\n" + "\n".join(f"• {m}" for m in molds))
+    await msg.answer(molds.list_text)
 
 
 # =========================
@@ -432,58 +715,129 @@ async def show_molds(msg: Message):
 
 
 
+ENTRIES_PAGE_SIZE = 10
+
+
+def entry_key(rec):
+    """An entry's place in the list, as carried in the ◀ / ▶ callback data."""
+    return f"{rec['date'] or 0}:{rec['id']}"
+
 
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime, timedelta
-import pytz
+async def entries_page(sess, before=None, after=None):
+    """Fetch one page of the worker's entries and build its inline keyboard.
+
+    ``before``/``after`` are (date, id) keys (see entry_key). Returns None
+    when the requested page is empty or ``sess`` is not logged in.
+    """
+    wid = await worker_id(sess)
+    if wid is None:
+        return None
+    # Fetch one extra row in the direction of travel to know if there is more
+    records = await db.aget_productions_for_worker(wid, ENTRIES_PAGE_SIZE + 1, before=before, after=after)
+    if not records:
+        return None
+
+    if after is not None:
+        has_newer = len(records) > ENTRIES_PAGE_SIZE
+        records = records[-ENTRIES_PAGE_SIZE:]
+        has_older = True
+    else:
+        has_older = len(records) > ENTRIES_PAGE_SIZE
+        records = records[:ENTRIES_PAGE_SIZE]
+        has_newer = before is not None
+
+    rows = [
+        [InlineKeyboardButton(
+            text=f"{i+1}. {r.get('production_type', '—')} ×{r.get('quantity', 0)} | {format_uzb_time(r.get('date'))}",
+            callback_data=f"edit:{r['id']}"
+        )]
+        for i, r in enumerate(records)
+    ]
+    nav = []
+    if has_older:
+        nav.append(InlineKeyboardButton(text="◀ Eskiroq", callback_data=f"entries:older:{entry_key(records[-1])}"))
+    if has_newer:
+        nav.append(InlineKeyboardButton(text="Yangiroq ▶", callback_data=f"entries:newer:{entry_key(records[0])}"))
+    if nav:
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
-UZB_TZ = pytz.timezone("Asia/Tashkent")
 
 # 📝 Mening yozuvlarim
-@dp.message(F.text == "📝 Mening Yozuvlarim")
+@router.button("📝 Mening Yozuvlarim")
 async def my_entries(msg: Message):
-    sess = user_sessions[msg.from_user.id]
-    records = [r for r in db.get_productions() if r["name"] == sess["name"]]
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
 
-    if not records:
+    kb = await entries_page(sess)
+
+    if kb is None:
         return await msg.answer("Hozircha yozuvlar yo‘q.")
 
-    # Only last 10 entries, newest first
-    records = sorted(records, key=lambda r: r["date"], reverse=True)[:10]
-    sess["my_entries"] = records
-
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(
-                text=f"{i+1}. {r.get('production_type', '—')} ×{r.get('quantity', 0)} | {format_uzb_time(r.get('date'))}",
-                callback_data=f"edit:{i}"
-            )]
-            for i, r in enumerate(records)
-        ]
-    )
     await msg.answer("✏️ Tahrirlash yoki o‘chirish uchun yozuvni tanlang:", reply_markup=kb)
 
 
-def format_uzb_time(date_str):
-    try:
-        dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-        dt = dt.replace(tzinfo=pytz.utc).astimezone(UZB_TZ)
-        return dt.strftime("%d.%m %H:%M")
-    except:
-        return date_str or "—"
+# ◀ / ▶ Yozuvlar sahifalari
+@router.callback("entries")
+async def my_entries_page(call: CallbackQuery):
+    sess = user_sessions.get(call.from_user.id)
+    if not logged_in(sess):
+        return await call.answer("⚠️ Siz tizimga kirmagansiz.")
+
+    parts = call.data.split(":")
+    if len(parts) != 4:
+        # A keyboard sent before entries were keyed by date
+        return await call.answer("Ro‘yxat eskirgan. «📝 Mening Yozuvlarim» ni qayta oching.")
+    _, direction, anchor_date, anchor_id = parts
+    anchor = (int(anchor_date), int(anchor_id))
+    if direction == "older":
+        kb = await entries_page(sess, before=anchor)
+    else:
+        kb = await entries_page(sess, after=anchor)
+
+    if kb is None:
+        return await call.answer("Boshqa yozuvlar yo‘q.")
+
+    await call.message.edit_reply_markup(reply_markup=kb)
+    await call.answer()
+
+
+def format_uzb_time(ts):
+    # Stored timestamps are UTC epoch seconds
+    if ts is None:
+        return "—"
+    return datetime.fromtimestamp(ts, UZB_TZ).strftime("%d.%m %H:%M")
 
 
-@dp.callback_query(F.data.startswith("edit:"))
+async def own_entry(call: CallbackQuery):
+    """The session and the entry whose id is in the callback data.
+
+    Answers the callback and returns (None, None) if the user is not logged
+    in, or the entry is gone or belongs to someone else.
+    """
+    sess = user_sessions.get(call.from_user.id)
+    if not logged_in(sess):
+        await call.answer("⚠️ Siz tizimga kirmagansiz.")
+        return None, None
+    entry_id = int(call.data.split(":")[1])
+    rec = await db.aget_production(entry_id)
+    if rec is None or rec["worker_id"] is None or rec["worker_id"] != await worker_id(sess):
+        await call.answer("Yozuv topilmadi.")
+        return None, None
+    return sess, rec
+
+
+@router.callback("edit")
 async def edit_entry(call: CallbackQuery):
-    sess = user_sessions[call.from_user.id]
-    idx = int(call.data.split(":")[1])
-    rec = sess["my_entries"][idx]
-    sess["editing"] = {"id": rec.get("id"), "idx": idx}
+    sess, rec = await own_entry(call)
+    if rec is None:
+        return
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✏️ Qolip turi", callback_data=f"edit_model:{idx}")],
-        [InlineKeyboardButton(text="🔢 Miqdor", callback_data=f"edit_qty:{idx}")],
-        [InlineKeyboardButton(text="🗑 O‘chirish", callback_data=f"delete:{idx}")]
+        [InlineKeyboardButton(text="✏️ Qolip turi", callback_data=f"edit_model:{rec['id']}")],
+        [InlineKeyboardButton(text="🔢 Miqdor", callback_data=f"edit_qty:{rec['id']}")],
+        [InlineKeyboardButton(text="🗑 O‘chirish", callback_data=f"delete:{rec['id']}")]
     ])
 
     await call.message.answer(
@@ -496,31 +850,33 @@ async def edit_entry(call: CallbackQuery):
     await call.answer()
 
 
-@dp.callback_query(F.data.startswith("edit_model:"))
+@router.callback("edit_model")
 async def edit_model(call: CallbackQuery):
-    idx = int(call.data.split(":")[1])
-    sess = user_sessions[call.from_user.id]
-    rec = sess["my_entries"][idx]
+    sess, rec = await own_entry(call)
+    if rec is None:
+        return
     sess["editing"] = {"id": rec.get("id"), "field": "production_type"}
+    sess["state"] = "editing_model"
 
-    molds = db.get_all_molds()
-    if not molds:
+    if not await send_mold_picker(call.message, sess, "edit", "✏️ Yangi qolip turini tanlang:"):
         return await call.message.answer("❌ Hozircha qoliplar mavjud emas. Admin qo‘shishi kerak.")
-
-    kb = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=m)] for m in molds] + [[CANCEL_BUTTON]],
-        resize_keyboard=True
-    )
-    await call.message.answer("✏️ Yangi qolip turini tanlang:", reply_markup=kb)
     await call.answer()
 
 
-@dp.callback_query(F.data.startswith("edit_qty:"))
+@mold_pick("edit", "editing_model")
+async def edit_model_finish(msg: Message, sess, name):
+    await db.aupdate_production(sess["editing"]["id"], {"production_type": name})
+    end_flow(sess)
+    await msg.answer("✅ Yangilandi!", reply_markup=main_menu(sess))
+
+
+@router.callback("edit_qty")
 async def edit_qty(call: CallbackQuery):
-    idx = int(call.data.split(":")[1])
-    sess = user_sessions[call.from_user.id]
-    rec = sess["my_entries"][idx]
+    sess, rec = await own_entry(call)
+    if rec is None:
+        return
     sess["editing"] = {"id": rec.get("id"), "field": "quantity"}
+    sess["state"] = "editing_quantity"
     await call.message.answer("🔢 Yangi miqdorni kiriting:", reply_markup=ReplyKeyboardMarkup(
         keyboard=[[CANCEL_BUTTON]],
         resize_keyboard=True
@@ -528,41 +884,26 @@ async def edit_qty(call: CallbackQuery):
     await call.answer()
 
 
-@dp.callback_query(F.data.startswith("delete:"))
+@router.callback("delete")
 async def delete_entry(call: CallbackQuery):
-    idx = int(call.data.split(":")[1])
-    sess = user_sessions[call.from_user.id]
-    rec = sess["my_entries"][idx]
+    sess, rec = await own_entry(call)
+    if rec is None:
+        return
 
-    if hasattr(db, "delete_production"):  # Real delete if implemented
-        db.delete_production(rec.get("id"))
-    else:
-        db.update_production(rec.get("id"), {"quantity": 0})
+    await db.adelete_production(rec["id"])
 
     await call.message.answer("🗑 Yozuv o‘chirildi!", reply_markup=main_menu(sess))
     await call.answer()
 
 
-@dp.message(lambda m: "editing" in user_sessions.get(m.from_user.id, {}))
+@router.state("editing_quantity")
 async def process_edit(msg: Message):
     sess = user_sessions[msg.from_user.id]
     rec = sess["editing"]
 
-    if msg.text == "❌ Bekor qilish":
-        sess.pop("editing", None)
-        sess["state"] = "logged_in"
-        return await msg.answer("Bekor qilindi.", reply_markup=main_menu(sess))
-
-    if rec["field"] == "quantity":
-        if not msg.text.strip().isdigit():
-            return await msg.answer("❌ Miqdor faqat raqam bo‘lishi kerak.")
-        db.update_production(rec["id"], {"quantity": int(msg.text.strip())})
-
-    elif rec["field"] == "production_type":
-        molds = db.get_all_molds()
-        if msg.text not in molds:
-            return await msg.answer("❌ Iltimos, ro‘yxatdan qolip tanlang.")
-        db.update_production(rec["id"], {"production_type": msg.text.strip()})
+    if not msg.text.strip().isdigit():
+        return await msg.answer("❌ Miqdor faqat raqam bo‘lishi kerak.")
+    await db.aupdate_production(rec["id"], {"quantity": int(msg.text.strip())})
 
     sess.pop("editing", None)
     sess["state"] = "logged_in"
@@ -571,17 +912,14 @@ async def process_edit(msg: Message):
 
 
 # 👥 Manage Users (Admin Only)
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-from aiogram import F
-from aiogram.types import Message, CallbackQuery
 
-@dp.message(F.text == "👥 Foydalanuvchilarni Boshqarish")
+@router.button("👥 Foydalanuvchilarni Boshqarish")
 async def manage_users(msg: Message):
     sess = user_sessions.get(msg.from_user.id)
-    if not sess or not sess.get("is_admin"):
+    if not logged_in(sess) or not sess.get("is_admin"):
         return await msg.answer("🚫 Ruxsat berilmagan.")
 
-    users = db.get_all_users()
+    users = await db.aget_all_users()
     if not users:
         user_list = "⚠️ Foydalanuvchilar topilmadi."
     else:
@@ -607,10 +945,10 @@ async def manage_users(msg: Message):
     )
 
 # 🗑 Remove User Step 1 — Ask for username
-@dp.message(F.text == "➖ Foydalanuvchini O‘chirish")
+@router.button("➖ Foydalanuvchini O‘chirish")
 async def ask_remove_user(msg: Message):
     sess = user_sessions.get(msg.from_user.id)
-    if not sess or not sess.get("is_admin"):
+    if not logged_in(sess) or not sess.get("is_admin"):
         return await msg.answer("🚫 Ruxsat berilmagan.")
 
     sess["state"] = "removing_user"
@@ -618,368 +956,126 @@ async def ask_remove_user(msg: Message):
 
 
 # 🗑 2-qadam — Foydalanuvchini o‘chirish jarayoni
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "removing_user")
+@router.state("removing_user")
 async def process_remove_user(msg: Message):
     sess = user_sessions[msg.from_user.id]
     username_to_remove = msg.text.strip().lstrip("@")
 
-    if not db.get_user(username_to_remove):
+    if not await db.aget_user(username_to_remove):
         sess["state"] = "logged_in"
         return await msg.answer("⚠️ Foydalanuvchi topilmadi.", reply_markup=main_menu(sess))
 
-    db.delete_user(username_to_remove)  # db.py ichida amalga oshirilishi kerak
+    await db.adelete_user(username_to_remove)  # db.py ichida amalga oshirilishi kerak
     sess["state"] = "logged_in"
     await msg.answer(f"✅ Foydalanuvchi `{username_to_remove}` o‘chirildi.", reply_markup=main_menu(sess), parse_mode="Markdown")
 
-# 🚪 Bekor qilish
-@dp.message(F.text == "❌ Bekor qilish")
-async def cancel_manage_users(msg: Message):
-    sess = user_sessions.get(msg.from_user.id)
-    if sess:
-        sess["state"] = "logged_in"
-    await msg.answer("❌ Bekor qilindi.", reply_markup=main_menu(sess))
 
 
-@dp.message(F.text == "📊 Barcha Ma'lumotlar")
-async def all_data(msg: Message):
-    sess = user_sessions.get(msg.from_user.id)
-    if not sess or not sess.get("is_admin"):
-        return await msg.answer("🚫 Ruxsat yo‘q.")
-
-    try:
-        rows = db.get_productions()
-        if not rows:
-            return await msg.answer("📭 Ishlab chiqarish bo‘yicha ma'lumotlar mavjud emas.")
-
-        df = pd.DataFrame(rows)
+report_cache = ReportCache()
+render_service = RenderService()
 
-        # ---- Map usernames -> display names (no structure change)
-        users_map = {username: info["name"] for username, info in db.get_all_users().items()}
-        if "name" in df.columns:
-            df["name"] = df["name"].map(lambda x: users_map.get(x, x))
+RENDER_BUSY_TEXT = "⚠️ Hozir juda ko‘p hisobot tayyorlanmoqda. Birozdan so‘ng qayta urinib ko‘ring."
 
-        # ---- Keep production_type as simple text
-        if "production_type" in df.columns:
-            df["production_type"] = df["production_type"].astype(str)
-        else:
-            df["production_type"] = ""
-
-        # ---- Ensure date column exists
-        if "date" not in df.columns:
-            return await msg.answer("⚠️ Ma'lumotlar bazasida 'date' ustuni yo‘q.")
 
-        # ---- Parse dates
-        df["date_parsed"] = pd.to_datetime(df["date"], errors="coerce")
-        if df["date_parsed"].isna().all():
-            return await msg.answer("⚠️ Sana formatlari noto‘g‘ri. Hech bir yozuvni o‘qib bo‘lmadi.")
+async def get_report(msg: Message, key, builder, *args):
+    """Return the cached report for ``key``, rendering it off-loop on a miss.
 
-        # ---- Coerce quantity to int
-        if "quantity" not in df.columns:
-            df["quantity"] = 0
-        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0).astype(int)
+    Admins asking for the same report at once share a single render.
+    Returns None when the builder found nothing to report.
+    """
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
 
-        now = datetime.now()
-        df_valid = df.dropna(subset=["date_parsed"]).copy()
+    # Refuse before promising a report
+    render_service.check(key)
+    await msg.answer("⏳ Hisobot tayyorlanmoqda, biroz kuting...")
+    with metrics.REPORT_SECONDS.time(key[0], "render"):
+        report = await render_service.render(key, builder, *args)
+    if report is None:
+        return None
 
-        df_month = df_valid[
-            (df_valid["date_parsed"].dt.year == now.year) &
-            (df_valid["date_parsed"].dt.month == now.month)
-        ].copy()
-
-        if df_month.empty:
-            return await msg.answer(f"📭 {now.strftime('%B %Y')} oyida ma'lumotlar topilmadi.")
+    # Whoever finishes first stores it; the others reuse that entry
+    text, path = report
+    cached = report_cache.get(key)
+    if cached is None:
+        import reports
+        cached = report_cache.put(key, reports.split_text(text), path)
+    elif cached.path != path:
+        report_cache.retire(path)
+    return cached
 
-        df_month["kun"] = df_month["date_parsed"].dt.day
-
-        # =================== TEXT OUTPUT ===================
-        text_lines = [f"📊 Ishlab chiqarish hisobot — {now.strftime('%B %Y')}\n"]
-
-        for day in sorted(df_month["kun"].unique()):
-            df_day = df_month[df_month["kun"] == day]
-            day_total = int(df_day["quantity"].sum())
-            text_lines.append(f"📅 {day}-kun — Jami: {day_total} dona")
-
-            worker_totals = (
-                df_day.groupby("name")["quantity"]
-                .sum()
-                .sort_values(ascending=False)
-            )
-            for worker, wtot in worker_totals.items():
-                text_lines.append(f"  👤 {worker}: {int(wtot)} dona")
-                df_w = df_day[df_day["name"] == worker]
-                model_totals = df_w.groupby("production_type")["quantity"].sum()
-                for model, mqty in model_totals.items():
-                    text_lines.append(f"    • {model}: {int(mqty)} dona")
-            text_lines.append("")
-
-        text_lines.append("📈 Oylik jami (ishchi bo‘yicha):")
-        worker_month = (
-            df_month.groupby("name")["quantity"]
-            .sum()
-            .sort_values(ascending=False)
-        )
-        for worker, qty in worker_month.items():
-            text_lines.append(f"  👤 {worker}: {int(qty)} dona")
-
-        text_lines.append("\n📦 Oylik jami (model bo‘yicha):")
-        model_month = (
-            df_month.groupby("production_type")["quantity"]
-            .sum()
-            .sort_values(ascending=False)
-        )
-        for model, qty in model_month.items():
-            text_lines.append(f"  • {model}: {int(qty)} dona")
-
-        total_month = int(df_month["quantity"].sum())
-        text_lines.append(f"\n🧾 Umumiy jami (oy): {total_month} dona")
-
-        # =================== EXCEL OUTPUT ===================
-        excel_df = df_month.copy()
-        for c in ["id", "name", "production_type", "quantity", "date"]:
-            if c not in excel_df.columns:
-                excel_df[c] = "" if c != "quantity" else 0
-
-        raw_sheet = (
-            excel_df[["id", "name", "production_type", "quantity", "date"]]
-            .sort_values("date")
-            .rename(columns={
-                "id": "ID",
-                "name": "Ishchi",
-                "production_type": "Model",
-                "quantity": "Soni",
-                "date": "Sana"
-            })
-        )
 
-        # Daily worker + model
-        daily_wm = (
-            df_month.groupby(["kun", "name", "production_type"])["quantity"]
-            .sum()
-            .reset_index()
-            .rename(columns={
-                "kun": "Kun",
-                "name": "Ishchi",
-                "production_type": "Model",
-                "quantity": "Soni"
-            })
-            .sort_values(["Kun", "Ishchi", "Model"])
-        )
+async def send_report(msg: Message, report):
+    """Send a cached report's text chunks and Excel file.
 
-        # Daily worker totals
-        daily_ws = (
-            df_month.groupby(["kun", "name"])["quantity"]
-            .sum()
-            .reset_index()
-            .rename(columns={
-                "kun": "Kun",
-                "name": "Ishchi",
-                "quantity": "JamiSoni"
-            })
-            .sort_values(["Kun", "JamiSoni"], ascending=[True, False])
-        )
+    The file is uploaded once; afterwards its Telegram file_id is reused.
+    """
+    for chunk in report.chunks:
+        await msg.answer(chunk)
 
-        # Monthly worker totals
-        worker_totals_df = (
-            worker_month.reset_index()
-            .rename(columns={"name": "Ishchi", "quantity": "Soni"})
-        )
+    if report.file_id:
+        await msg.answer_document(report.file_id)
+    else:
+        sent = await msg.answer_document(FSInputFile(report.path))
+        if sent.document:
+            report.file_id = sent.document.file_id
 
-        # Monthly model totals
-        model_totals_df = (
-            model_month.reset_index()
-            .rename(columns={"production_type": "Model", "quantity": "Soni"})
-        )
 
-        # ✅ NEW: Monthly worker + model totals
-        worker_model_month_df = (
-            df_month.groupby(["name", "production_type"])["quantity"]
-            .sum()
-            .reset_index()
-            .rename(columns={
-                "name": "Ishchi",
-                "production_type": "Model",
-                "quantity": "Soni"
-            })
-            .sort_values(["Ishchi", "Model"])
-        )
+@router.button("📊 Barcha Ma'lumotlar")
+async def all_data(msg: Message):
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
+        return await msg.answer("🚫 Ruxsat yo‘q.")
 
-        # Save Excel
-        fname = f"Barcha_Malumotlar_{now.strftime('%Y-%m')}.xlsx"
-        with pd.ExcelWriter(fname, engine="openpyxl") as writer:
-            raw_sheet.to_excel(writer, sheet_name="Xom", index=False)
-            daily_wm.to_excel(writer, sheet_name="Kunlik_Ishchi_Model", index=False)
-            daily_ws.to_excel(writer, sheet_name="Kunlik_Ishchi_Jami", index=False)
-            worker_totals_df.to_excel(writer, sheet_name="Oylik_Ishchi_Jami", index=False)
-            model_totals_df.to_excel(writer, sheet_name="Oylik_Model_Jami", index=False)
-            worker_model_month_df.to_excel(writer, sheet_name="Oylik_Ishchi_Model", index=False)  # ✅ new sheet
-
-        # =================== SEND TEXT + FILE ===================
-        assembled = "\n".join(text_lines)
-        max_len = 3900
-        if len(assembled) <= max_len:
-            await msg.answer(assembled)
-        else:
-            start = 0
-            while start < len(assembled):
-                await msg.answer(assembled[start:start + max_len])
-                start += max_len
+    try:
+        import reports
+        now = datetime.now(UZB_TZ)
+        key = ("monthly", now.strftime("%Y-%m"), await db.aget_data_version())
+        cached = await get_report(msg, key, reports.build_monthly_report, now)
+        if cached is None:
+            return await msg.answer(f"📭 {now.strftime('%B %Y')} oyida ma'lumotlar topilmadi.")
 
-        await msg.answer_document(FSInputFile(fname))
+        await send_report(msg, cached)
 
+    except RenderBusy:
+        await msg.answer(RENDER_BUSY_TEXT)
     except Exception as e:
-        print("Xatolik (all_data):", e)
+        log.exception("Monthly report failed", extra={"user_id": msg.from_user.id})
         await msg.answer(f"⚠️ Hisobot yaratishda xatolik: {e}")
 
 
-
-from aiogram import F
-from aiogram.types import Message, FSInputFile
-import pandas as pd
-from datetime import datetime, date
-import db  # your DB module
-
-@dp.message(F.text == "🗓 Kunlik Hisobot")
+@router.button("🗓 Kunlik Hisobot")
 async def daily_report(msg: Message):
-    print("[DEBUG] Daily report button clicked, text:", msg.text)
     sess = user_sessions.get(msg.from_user.id)
-    if not sess or not sess.get("is_admin"):
-        print("[DEBUG] Access denied for user:", msg.from_user.id)
+    if not logged_in(sess) or not sess.get("is_admin"):
+        log.info("Daily report denied", extra={"user_id": msg.from_user.id})
         return await msg.answer("🚫 Ruxsat etilmagan.")
 
-    today = date.today()
-    print("[DEBUG] Today is:", today)
-
-    # 1️⃣ Fetch all productions from DB
-    all_recs = db.get_productions()
-    print("[DEBUG] All productions from DB:", all_recs)
-
-    # 2️⃣ Filter today's records
-    recs = []
-    for r in all_recs:
-        r_date = r.get("date")
-        parsed_date = None
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y"):
-            try:
-                parsed_date = datetime.strptime(str(r_date), fmt).date()
-                break
-            except ValueError:
-                continue
-        if not parsed_date:
-            print(f"[DEBUG] Skipping record with bad date format: {r_date}")
-            continue
-        if parsed_date == today:
-            recs.append(r)
-
-    print("[DEBUG] Today's matched records:", recs)
+    import reports
+    today = datetime.now(UZB_TZ).date()
 
-    if not recs:
+    key = ("daily", today.isoformat(), await db.aget_data_version())
+    try:
+        cached = await get_report(msg, key, reports.build_daily_report, today)
+    except RenderBusy:
+        return await msg.answer(RENDER_BUSY_TEXT)
+    if cached is None:
         return await msg.answer("📭 Bugun hech qanday yozuv yo‘q.")
 
-    # 3️⃣ Refresh worker names
-    users = db.get_all_users()
-    print("[DEBUG] All users from DB:", users)
-
-    for rec in recs:
-        raw_name = str(rec.get("name", "")).strip()
-        if raw_name in users:
-            rec["name"] = users[raw_name]["name"]
-        else:
-            match = next((u["name"] for uname, u in users.items() if uname.lower() == raw_name.lower()), None)
-            if match:
-                rec["name"] = match
-            else:
-                print(f"[DEBUG] No user match for production name: {raw_name}")
-
-    # 4️⃣ Map molds
-    molds_list = db.get_all_molds()
-    molds_map = {str(name).strip().lower(): name for name in molds_list}
-    print("[DEBUG] All molds:", molds_list)
-
-    for rec in recs:
-        ptype = str(rec.get("production_type", "")).strip()
-        rec["production_type"] = molds_map.get(ptype.lower(), ptype or "❓ Model yo‘q")
-
-    # 5️⃣ Create DataFrame
-    df = pd.DataFrame(recs)
-
-    for col in ["name", "production_type", "quantity", "date"]:
-        if col not in df.columns:
-            df[col] = ""
-
-    df.rename(columns={
-        "name": "👤 Ishchi",
-        "production_type": "📦 Model",
-        "quantity": "🔢 Miqdor",
-        "date": "📅 Sana"
-    }, inplace=True)
-
-    df["🔢 Miqdor"] = pd.to_numeric(df["🔢 Miqdor"], errors="coerce").fillna(0).astype(int)
-    df["📅 Sana"] = pd.to_datetime(df["📅 Sana"], errors="coerce").dt.strftime("%Y-%m-%d %H:%M")
-
-    # 6️⃣ Build text output
-    text_lines = [f"📊 **Kunlik Ishlab Chiqarish Hisoboti — {today.strftime('%d.%m.%Y')}**\n"]
-
-    group = df.groupby(["👤 Ishchi", "📦 Model"], dropna=False)["🔢 Miqdor"].sum().reset_index()
-
-    for worker in sorted(group["👤 Ishchi"].fillna("❓ Noma'lum").unique()):
-        text_lines.append(f"👤 {worker}:")
-        models_for_worker = group[group["👤 Ishchi"] == worker]
-        total_worker = 0
-        for _, row in models_for_worker.iterrows():
-            model = row["📦 Model"] if pd.notna(row["📦 Model"]) else "❓ Model yo‘q"
-            qty = int(row["🔢 Miqdor"])
-            total_worker += qty
-            text_lines.append(f"    • {model}: {qty} dona")
-        text_lines.append(f"  🔹 Jami: {total_worker} dona\n")
-
-    total_qty = int(df["🔢 Miqdor"].sum())
-    text_lines.append(f"🛠 **Umumiy kunlik jami**: {total_qty} dona")
-
-    # 7️⃣ Save Excel with better structure
-    fname = f"Kunlik_Hisobot_{today.strftime('%Y-%m-%d')}.xlsx"
-
-    # Extra breakdown for Excel
-    worker_model_df = group.rename(columns={
-        "👤 Ishchi": "Ishchi",
-        "📦 Model": "Model",
-        "🔢 Miqdor": "Soni"
-    })
-
-    worker_total_df = df.groupby("👤 Ishchi")["🔢 Miqdor"].sum().reset_index().rename(columns={
-        "👤 Ishchi": "Ishchi",
-        "🔢 Miqdor": "Kunlik Jami"
-    })
-
-    with pd.ExcelWriter(fname, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name="Xom Ma'lumot", index=False)
-        worker_model_df.to_excel(writer, sheet_name="Ishchi_Model", index=False)
-        worker_total_df.to_excel(writer, sheet_name="Ishchi_Kunlik_Jami", index=False)
-
-    print("[DEBUG] Excel saved as:", fname)
-
-    # 8️⃣ Send to Telegram
-    assembled = "\n".join(text_lines)
-    max_len = 3900
-    if len(assembled) <= max_len:
-        await msg.answer(assembled)
-    else:
-        start = 0
-        while start < len(assembled):
-            await msg.answer(assembled[start:start + max_len])
-            start += max_len
-
-    await msg.answer_document(FSInputFile(fname))
-    print("========== DAILY REPORT END ==========")
+    await send_report(msg, cached)
+    log.debug("Daily report %s sent", today, extra={"user_id": msg.from_user.id, "path": cached.path})
 
 
 # ⚙ Edit Profile
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
 # ⚙ Profilni Tahrirlash
-@dp.message(F.text == "⚙ Profilni Tahrirlash")
+@router.button("⚙ Profilni Tahrirlash")
 async def edit_profile(msg: Message):
-    print("[DEBUG] Edit profile clicked")
-    sess = user_sessions[msg.from_user.id]
+    sess = user_sessions.get(msg.from_user.id)
+    if not logged_in(sess):
+        return await msg.answer("⚠️ Siz tizimga kirmagansiz.")
+
     sess["state"] = "editing_profile"
 
     kb = ReplyKeyboardMarkup(
@@ -995,40 +1091,80 @@ async def edit_profile(msg: Message):
     )
 
 
-# ❌ Profil tahririni bekor qilish (works anywhere now)
-@dp.message(F.text == "❌ Bekor qilish")
-async def cancel_edit_profile(msg: Message):
-    print("[DEBUG] Cancel pressed")
-    sess = user_sessions.get(msg.from_user.id)
-
-    if sess:
-        sess["state"] = "logged_in"  # Always reset to logged_in
-        await msg.answer("✅ Amaliyot bekor qilindi.", reply_markup=main_menu(sess))
-    else:
-        await msg.answer("⚠️ Siz tizimga kirmagansiz.")
-
-
 # Save new profile name when in editing_profile
-@dp.message(lambda m: user_sessions.get(m.from_user.id, {}).get("state") == "editing_profile")
+@router.state("editing_profile")
 async def save_profile(msg: Message):
-    print(f"[DEBUG] Saving new profile name: {msg.text}")
     new_name = msg.text.strip()
     sess = user_sessions[msg.from_user.id]
-    db.update_user(sess["username"], {"name": new_name})
+    log.debug("Profile renamed to %r", new_name, extra={"user_id": msg.from_user.id, "username": sess["username"]})
+    # Entries refer to the user by id, so they show up under the new name
+    await db.aupdate_user(sess["username"], {"name": new_name})
     sess["name"] = new_name
     sess["state"] = "logged_in"
     await msg.answer(f"✅ Ism {new_name} ga o‘zgartirildi.", reply_markup=main_menu(sess))
 
 # 🚪 Chiqish
-@dp.message(F.text == "🚪 Chiqish")
+@router.button("🚪 Chiqish")
 async def logout(msg: Message):
     user_sessions.pop(msg.from_user.id, None)
     await msg.answer("✅ Tizimdan chiqdingiz.", reply_markup=ReplyKeyboardRemove())
 
-@dp.message()
+@router.fallback
 async def fallback(msg: Message):
     await msg.answer("📋 Iltimos, menyudan tanlang.")
 
+# 🚀 Startup
+PREWARM_REPORTS = os.getenv("PREWARM_REPORTS", "1") == "1"
+PREWARM_DELAY = 2.0  # seconds; let the bot start and answer first
+
+
+def prewarm_reports():
+    """Import the report builders in the background so the first report is fast."""
+    import reports  # noqa: F401
+
+
+metrics_server = None
+
+
+@dp.startup()
+async def on_startup(bot: Bot):
+    global metrics_server
+    await asyncio.to_thread(db.init_db)
+    await user_sessions.purge(SESSION_MAX_AGE)
+    notifier.start(bot)
+    if PREWARM_REPORTS:
+        timer = threading.Timer(PREWARM_DELAY, prewarm_reports)
+        timer.daemon = True
+        timer.start()
+    if METRICS_PORT and metrics_server is None:
+        try:
+            metrics_server = await monitoring.start_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            # e.g. another bot process already serves this port
+            log.warning("Metrics endpoint %s:%s not started: %s", METRICS_HOST, METRICS_PORT, e)
+
+
+@dp.shutdown()
+async def on_shutdown():
+    global metrics_server
+    # Deliver what is still queued, including unsent digests
+    await notifier.close()
+    report_cache.close()
+    if metrics_server is not None:
+        await metrics_server.cleanup()
+        metrics_server = None
+
+
 if __name__ == "__main__":
-    print("[BOT] Started")
-    asyncio.run(dp.start_polling(bot))
+    logs.setup()
+    log.info("Bot started", extra={"mode": BOT_MODE})
+    try:
+        if BOT_MODE == "webhook":
+            import webhook
+            webhook.run(dp, bot)
+        else:
+            asyncio.run(dp.start_polling(bot))
+    finally:
+        render_service.shutdown()
+        db.close_all()
+        logs.shutdown()
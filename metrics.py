@@ -0,0 +1,186 @@
+"""In-process metrics, exported in the Prometheus text format.
+
+Counters and histograms with labels, kept in plain dicts behind one lock
+per metric, so db threads and the event loop can record into them. No
+third-party client: the bot needs a handful of series, and this module is
+also imported by the render worker processes, which should stay light.
+
+Render workers have their own copy of the registry; RenderService sends
+back what a render recorded (``collect``) and the bot process merges it
+into its own, so report query and Excel timings show up in /metrics too.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Seconds; from a fast indexed query to a big monthly Excel file
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# The handler an update ended up in; the StateRouter entry points set it
+HANDLER_LABEL = ContextVar("HANDLER_LABEL", default="unknown")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for label_values, value in values.items():
+                self._values[label_values] = self._values.get(label_values, 0) + value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+    def drain(self):
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series):
+        with self._lock:
+            for label_values, (counts, total) in series.items():
+                mine = self._series.get(label_values)
+                if mine is None:
+                    self._series[label_values] = [list(counts), total]
+                else:
+                    mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                    mine[1] += total
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def drain(self):
+        """Everything recorded so far, removed from this registry (picklable)."""
+        return {name: metric.drain() for name, metric in self._metrics.items()}
+
+    def merge(self, drained):
+        for name, values in drained.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+
+REGISTRY = Registry()
+
+UPDATES = REGISTRY.register(Counter(
+    "bot_updates_total", "Updates that reached a handler, by update type", ("type",)))
+HANDLER_SECONDS = REGISTRY.register(Histogram(
+    "bot_handler_seconds", "Time to handle one update, by handler", ("handler",)))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    "bot_handler_errors_total", "Updates whose handler raised, by handler", ("handler",)))
+DB_SECONDS = REGISTRY.register(Histogram(
+    "bot_db_query_seconds", "Time spent in a db.py call, by function", ("query",)))
+DB_ROWS = REGISTRY.register(Counter(
+    "bot_db_rows_total", "Rows returned by db.py calls, by function", ("query",)))
+REPORT_SECONDS = REGISTRY.register(Histogram(
+    "bot_report_seconds", "Report rendering time by report and stage "
+    "(render: as waited for by the handler, excel: writing the workbook)", ("report", "stage")))
+
+
+def collect(func, *args):
+    """Run ``func(*args)`` and return (result, what it recorded); for worker processes."""
+    REGISTRY.drain()  # anything left over from before is not ours
+    result = func(*args)
+    return result, REGISTRY.drain()
@@ -0,0 +1,117 @@
+"""In-memory copy of the mold list, with a prefix index and an inline picker.
+
+Almost every production step needs the mold list, either to validate a
+choice or to let the user pick one. The catalog keeps an immutable
+snapshot (names sorted case-insensitively, a set for membership, id
+lookups) and rebuilds it only when the molds actually change:
+
+  * ``invalidate()`` after this process adds or removes a mold;
+  * otherwise each ``snapshot()`` probes SQLite's data_version (no page
+    reads) and, only if some connection committed since the last probe,
+    compares the trigger-maintained ``molds_version`` counter. That keeps
+    other processes' mold edits (CLI scripts, a second bot) visible too.
+
+Molds are picked from a paginated inline keyboard rather than a reply
+keyboard with one row per mold: a page is always PICKER_PAGE_SIZE buttons,
+and typing the first letters of a name narrows it down with two bisects
+over the sorted, case-folded names. Buttons carry mold ids, since names
+can exceed Telegram's 64-byte callback data limit.
+"""
+from bisect import bisect_left
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import db
+
+PICKER_COLUMNS = 2
+PICKER_PAGE_SIZE = 10
+_PREFIX_END = chr(0x10FFFF)
+
+
+class MoldSnapshot:
+    __slots__ = ("version", "names", "ids", "keys", "index", "by_id", "list_text")
+
+    def __init__(self, version, molds):
+        molds = sorted(molds, key=lambda m: m[1].casefold())
+        self.version = version
+        self.names = tuple(name for _, name in molds)
+        self.ids = tuple(mold_id for mold_id, _ in molds)
+        self.keys = [name.casefold() for name in self.names]
+        self.index = frozenset(self.names)
+        self.by_id = {mold_id: name for mold_id, name in molds}
+        self.list_text = "📋 Hozirgi qoliplar:\n" + "\n".join(f"• {m}" for m in self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, name):
+        """The catalog spelling of ``name``, matched exactly or ignoring case."""
+        name = name.strip()
+        if name in self.index:
+            return name
+        key = name.casefold()
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.names[i]
+        return None
+
+    def prefix_range(self, prefix):
+        """[lo, hi) positions of the names starting with ``prefix`` (any case)."""
+        key = prefix.strip().casefold()
+        if not key:
+            return 0, len(self.names)
+        return bisect_left(self.keys, key), bisect_left(self.keys, key + _PREFIX_END)
+
+    def picker(self, purpose, prefix="", page=0):
+        """One page of the inline mold picker, or None if nothing matches.
+
+        Callback data: ``mold:<purpose>:<id>`` to choose,
+        ``molds:<purpose>:<page>`` to turn the page, ``cancel`` to give up
+        (``noop`` on the page counter).
+        """
+        lo, hi = self.prefix_range(prefix)
+        if lo >= hi:
+            return None
+        pages = (hi - lo + PICKER_PAGE_SIZE - 1) // PICKER_PAGE_SIZE
+        page = min(max(page, 0), pages - 1)
+        start = lo + page * PICKER_PAGE_SIZE
+        end = min(start + PICKER_PAGE_SIZE, hi)
+
+        buttons = [
+            InlineKeyboardButton(text=self.names[i], callback_data=f"mold:{purpose}:{self.ids[i]}")
+            for i in range(start, end)
+        ]
+        rows = [buttons[i:i + PICKER_COLUMNS] for i in range(0, len(buttons), PICKER_COLUMNS)]
+        if pages > 1:
+            nav = []
+            if page > 0:
+                nav.append(InlineKeyboardButton(text="◀", callback_data=f"molds:{purpose}:{page - 1}"))
+            nav.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="noop"))
+            if page < pages - 1:
+                nav.append(InlineKeyboardButton(text="▶", callback_data=f"molds:{purpose}:{page + 1}"))
+            rows.append(nav)
+        rows.append([InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel")])
+        return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+class MoldCatalog:
+    def __init__(self):
+        self._snapshot = None
+        self._marker = None
+
+    def invalidate(self):
+        self._snapshot = None
+
+    async def snapshot(self):
+        marker = await db.adb_changed_marker()
+        current = self._snapshot
+        if current is not None and marker == self._marker:
+            return current
+
+        self._marker = marker
+        if current is None or await db.aget_molds_version() != current.version:
+            current = self._snapshot = MoldSnapshot(*await db.aget_molds_catalog())
+        return current
@@ -0,0 +1,70 @@
+"""Handler metrics for the Dispatcher and a local /metrics endpoint.
+
+``setup(dp)`` adds MetricsMiddleware to message and callback handlers. It
+counts updates by type, times each one into bot_handler_seconds and
+counts those whose handler raised; with the bot.updates logger at DEBUG
+it also logs one record per update. Most updates go through the
+StateRouter entry points, which set metrics.HANDLER_LABEL to the handler
+they picked, so the series are labelled with names like ``confirm_prod``
+rather than ``route_message``.
+
+``start_server`` serves metrics.REGISTRY in the Prometheus text format on
+its own small aiohttp app. It is meant for localhost scrapes and is not
+part of the webhook app, which faces Telegram.
+"""
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from aiohttp import web
+
+import metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+update_log = logging.getLogger("bot.updates")
+
+
+class MetricsMiddleware(BaseMiddleware):
+    def __init__(self, update_type):
+        self.update_type = update_type
+
+    async def __call__(self, handler, event, data):
+        token = metrics.HANDLER_LABEL.set(data["handler"].callback.__name__)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.HANDLER_ERRORS.inc(metrics.HANDLER_LABEL.get())
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            name = metrics.HANDLER_LABEL.get()
+            metrics.HANDLER_SECONDS.observe(elapsed, name)
+            metrics.UPDATES.inc(self.update_type)
+            metrics.HANDLER_LABEL.reset(token)
+            if update_log.isEnabledFor(logging.DEBUG):
+                user = getattr(event, "from_user", None)
+                update_log.debug("%s %.1f ms", name, elapsed * 1000, extra={
+                    "handler": name, "type": self.update_type,
+                    "user_id": user.id if user else None, "seconds": round(elapsed, 6),
+                })
+
+
+def setup(dp):
+    dp.message.middleware(MetricsMiddleware("message"))
+    dp.callback_query.middleware(MetricsMiddleware("callback_query"))
+
+
+async def handle_metrics(request):
+    return web.Response(body=metrics.REGISTRY.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_server(host, port):
+    """Serve GET /metrics on host:port; returns the runner (``await runner.cleanup()`` to stop)."""
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
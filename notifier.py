@@ -0,0 +1,195 @@
+"""Background delivery of admin notifications.
+
+Handlers hand a notification to ``Notifier.notify`` and return at once;
+sending happens in background tasks, one "lane" per chat:
+
+  * a lane keeps its chat's messages in order and spaces them by
+    ``per_chat_interval`` (Telegram allows about one message per second
+    to the same chat);
+  * all lanes share a token bucket for the bot-wide limit (about 30
+    messages per second), so different chats are served concurrently
+    without exceeding it;
+  * a TelegramRetryAfter pauses only the lane it hit, for as long as
+    Telegram asks, and the message is retried;
+  * for chats in digest mode, lines are buffered and sent as one message
+    once ``digest_size`` lines collect or ``digest_interval`` seconds pass
+    since the first one.
+
+A lane task exits after ``idle_timeout`` seconds with nothing to send.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+
+MAX_MESSAGE_LEN = 3900
+
+log = logging.getLogger("notifier")
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class _Lane:
+    __slots__ = ("messages", "digest", "digest_started", "wakeup", "task", "next_send")
+
+    def __init__(self):
+        self.messages = deque()
+        self.digest = []
+        self.digest_started = None
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.next_send = 0.0
+
+
+class Notifier:
+    def __init__(self, global_rate=25, per_chat_interval=1.0, digest_size=20,
+                 digest_interval=300, idle_timeout=60, max_retries=5):
+        self.bucket = TokenBucket(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.digest_size = digest_size
+        self.digest_interval = digest_interval
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.bot = None
+        self.sent = 0
+        self.failed = 0
+        self._lanes = {}
+        self._closing = False
+
+    def start(self, bot):
+        self.bot = bot
+        self._closing = False
+
+    # ---------- enqueue (never blocks) ----------
+    def notify(self, chat_id, text):
+        """Queue ``text`` for immediate delivery to ``chat_id``."""
+        lane = self._lane(chat_id)
+        lane.messages.append(text)
+        lane.wakeup.set()
+
+    def add_to_digest(self, chat_id, line):
+        """Queue ``line`` for ``chat_id``'s next digest message."""
+        lane = self._lane(chat_id)
+        if not lane.digest:
+            lane.digest_started = time.monotonic()
+        lane.digest.append(line)
+        lane.wakeup.set()
+
+    def notify_many(self, targets, text, digest_lines):
+        """Fan out to (chat_id, wants_digest) pairs: the full text, or digest lines."""
+        for chat_id, wants_digest in targets:
+            if wants_digest:
+                for line in digest_lines:
+                    self.add_to_digest(chat_id, line)
+            else:
+                self.notify(chat_id, text)
+
+    async def close(self, timeout=10):
+        """Send pending digests now and wait (up to ``timeout``) for the lanes to drain."""
+        self._closing = True
+        for lane in self._lanes.values():
+            lane.wakeup.set()
+        tasks = [lane.task for lane in self._lanes.values() if lane.task]
+        if tasks:
+            _, still_running = await asyncio.wait(tasks, timeout=timeout)
+            for task in still_running:
+                task.cancel()
+
+    # ---------- delivery ----------
+    def _lane(self, chat_id):
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _Lane()
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._run_lane(chat_id, lane))
+        return lane
+
+    def _digest_due(self, lane):
+        if not lane.digest:
+            return False
+        return (
+            self._closing
+            or len(lane.digest) >= self.digest_size
+            or time.monotonic() - lane.digest_started >= self.digest_interval
+        )
+
+    async def _run_lane(self, chat_id, lane):
+        while True:
+            if lane.messages:
+                await self._send(chat_id, lane, lane.messages.popleft())
+            elif self._digest_due(lane):
+                # Swap the buffer first: lines may arrive while we send
+                lines, lane.digest, lane.digest_started = lane.digest, [], None
+                for text in _digest_messages(lines):
+                    await self._send(chat_id, lane, text)
+            elif self._closing and not lane.digest:
+                break
+            else:
+                if lane.digest:
+                    timeout = lane.digest_started + self.digest_interval - time.monotonic()
+                else:
+                    timeout = self.idle_timeout
+                lane.wakeup.clear()
+                try:
+                    await asyncio.wait_for(lane.wakeup.wait(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    if not lane.digest and not lane.messages:
+                        break
+        # Only drop the lane if nothing was queued while we were finishing
+        if not lane.messages and not lane.digest and self._lanes.get(chat_id) is lane:
+            del self._lanes[chat_id]
+
+    async def _send(self, chat_id, lane, text):
+        for _ in range(self.max_retries):
+            delay = lane.next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text)
+            except TelegramRetryAfter as e:
+                lane.next_send = time.monotonic() + e.retry_after
+                continue
+            except Exception as e:
+                # Blocked the bot, chat gone, network down: not retried
+                log.warning("Alert to %s not delivered: %s", chat_id, e, extra={"chat_id": chat_id})
+                self.failed += 1
+                return
+            lane.next_send = time.monotonic() + self.per_chat_interval
+            self.sent += 1
+            return
+        log.warning("Alert to %s dropped after %d retries", chat_id, self.max_retries, extra={"chat_id": chat_id})
+        self.failed += 1
+
+
+def _digest_messages(lines):
+    """Join digest lines into as few messages as fit Telegram's length limit."""
+    header = f"🗂 {len(lines)} ta yangi yozuv:\n"
+    chunk = header
+    for line in lines:
+        if len(chunk) + len(line) + 1 > MAX_MESSAGE_LEN:
+            yield chunk
+            chunk = ""
+        chunk += line + "\n"
+    if chunk:
+        yield chunk
@@ -0,0 +1,9 @@
+import db
+
+# Recompute the production_daily_totals rollup from the raw productions table.
+# Run after editing factory.db by hand or if the totals ever look off.
+db.init_db()
+rows = db.rebuild_daily_totals()
+db.close_all()
+
+print(f"✅ Kunlik jami jadvali qayta hisoblandi: {rows} ta qator")
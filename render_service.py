@@ -0,0 +1,67 @@
+"""Runs report builders in a process pool, off the bot's event loop.
+
+Report grouping and openpyxl writing are CPU-bound and hold the GIL, so a
+thread is not enough to keep other chats responsive; builders run in
+separate processes instead. Concurrent requests for the same report key
+share one in-flight render, and the number of distinct renders waiting or
+running is bounded. What a render records in metrics (its db queries, the
+Excel writing) is brought back and merged into the bot process's metrics.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+
+class RenderBusy(Exception):
+    """Too many different reports are already being rendered."""
+
+
+class RenderService:
+    def __init__(self, workers=2, max_pending=8):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._inflight = {}
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn, not fork: the bot process has live SQLite connections
+            # and db threads that must not be duplicated into children
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def check(self, key):
+        """Raise RenderBusy if a render for ``key`` would be refused right now."""
+        if key not in self._inflight and len(self._inflight) >= self.max_pending:
+            raise RenderBusy()
+
+    async def render(self, key, func, *args):
+        """Run ``func(*args)`` in the pool, or join the render already running for ``key``.
+
+        ``func`` must be a picklable module-level function.
+        Raises RenderBusy when max_pending distinct renders are queued.
+        """
+        self.check(key)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(func, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one waiter giving up must not cancel the render for the others
+        return await asyncio.shield(future)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        result, recorded = await loop.run_in_executor(self._executor(), metrics.collect, func, *args)
+        metrics.REGISTRY.merge(recorded)
+        return result
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
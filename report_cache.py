@@ -0,0 +1,121 @@
+"""In-memory cache of finished admin reports.
+
+Entries are keyed by (report type, period, db data version). Any write to
+productions, user names or molds bumps the data version, so a stale report
+is never served; it simply stops being looked up and ages out. Once a
+report's Excel file has been uploaded, its Telegram file_id is kept so
+repeat requests resend it without uploading again.
+
+Every render writes its own file (see reports.report_path). A file whose
+entry leaves the cache is deleted after a grace period, so an admin who is
+still being sent it does not lose it mid-upload.
+"""
+import os
+import time
+from collections import OrderedDict, deque
+
+
+def remove_report_file(path):
+    """Delete a report file and its per-render directory."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(path)
+    if os.path.basename(directory).startswith("report-"):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+class CachedReport:
+    __slots__ = ("chunks", "path", "file_id", "created", "size")
+
+    def __init__(self, chunks, path):
+        self.chunks = chunks
+        self.path = path
+        self.file_id = None
+        self.created = time.monotonic()
+        size = sum(len(c.encode()) for c in chunks)
+        if path and os.path.exists(path):
+            size += os.path.getsize(path)
+        self.size = size
+
+
+class ReportCache:
+    """LRU cache bounded by entry count, total size and entry age."""
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024, max_age=6 * 3600, file_grace=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.file_grace = file_grace
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._retired = deque()  # (retired at, path), oldest first
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created > self.max_age:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, chunks, path):
+        report_type, period, version = key
+        # Older versions of the same report can never be hit again. A render
+        # that finishes after a newer one must not push the newer one out.
+        for old in [k for k in self._entries if k[:2] == (report_type, period) and k[2] < version]:
+            self._drop(old)
+        if key in self._entries:
+            self._drop(key, keep_file=self._entries[key].path == path)
+
+        entry = CachedReport(chunks, path)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        self._remove_retired()
+        return entry
+
+    def retire(self, path):
+        """Delete a report file once the grace period has passed."""
+        if path:
+            self._retired.append((time.monotonic(), path))
+
+    def clear(self):
+        for key in list(self._entries):
+            self._drop(key)
+
+    def close(self):
+        """Drop every entry and delete all report files now (call on shutdown)."""
+        self.clear()
+        while self._retired:
+            remove_report_file(self._retired.popleft()[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key, keep_file=False):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if not keep_file:
+            self.retire(entry.path)
+
+    def _remove_retired(self):
+        now = time.monotonic()
+        while self._retired and now - self._retired[0][0] > self.file_grace:
+            remove_report_file(self._retired.popleft()[1])
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if now - e.created > self.max_age]:
+            self._drop(key)
+        # Always keep the newest entry, even if it alone is over the byte limit
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._drop(next(iter(self._entries)))
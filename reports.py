@@ -0,0 +1,235 @@
+"""Admin reports: "📊 Barcha Ma'lumotlar" (monthly) and "🗓 Kunlik Hisobot" (daily).
+
+Totals come from db.aggregate_productions, so the text and the summary
+sheets are built from (day, worker, model) sums instead of raw rows.
+Workers and molds come back under their current names, joined in SQL on
+the entries' worker_id/mold_id. The raw-entry sheets are streamed from a
+db cursor into a write-only workbook, so memory stays flat however many
+entries a month has.
+Builders are synchronous; handlers run them off the event loop.
+"""
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+import db
+import metrics
+
+NO_MODEL = "❓ Model yo‘q"
+NO_NAME = "❓ Noma'lum"
+MAX_MESSAGE_LEN = 3900  # stay under Telegram's 4096-character limit
+
+
+def split_text(text, max_len=MAX_MESSAGE_LEN):
+    """Split report text into Telegram-sized chunks."""
+    return [text[start:start + max_len] for start in range(0, len(text), max_len)]
+
+
+def _label(value, placeholder):
+    """A worker/mold name as shown, or ``placeholder`` for a blank one."""
+    return str(value or "").strip() or placeholder
+
+
+def _totals(start, end):
+    """{(day, worker, model): quantity}"""
+    totals = defaultdict(int)
+    for row in db.aggregate_productions(start, end, by=("day", "name", "production_type")):
+        key = (row["day"], _label(row["name"], NO_NAME), _label(row["production_type"], NO_MODEL))
+        totals[key] += int(row["quantity"] or 0)
+    return totals
+
+
+def _format_date(ts, fmt="%Y-%m-%d %H:%M:%S"):
+    dt = db.from_epoch(ts)
+    return dt.strftime(fmt) if dt else ""
+
+
+def _sum_by(totals, *positions):
+    """Re-group {(day, worker, model): qty} by the given key positions."""
+    out = defaultdict(int)
+    for key, qty in totals.items():
+        out[tuple(key[p] for p in positions)] += qty
+    return out
+
+
+def _nest(totals):
+    """{(a, b, ...): qty} -> {a: [(b, ...), qty]} keeping key order."""
+    out = defaultdict(list)
+    for key, qty in sorted(totals.items()):
+        out[key[0]].append((key[1:], qty))
+    return out
+
+
+def _desc(items):
+    """Sort (key, qty) pairs by quantity, largest first (stable)."""
+    return sorted(items, key=lambda kv: -kv[1])
+
+
+# ======================
+# 📄 Excel Writer
+# ======================
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(*(Side(style="thin"),) * 4)
+_HEADER_ALIGN = Alignment(horizontal="center", vertical="top")
+
+
+def report_path(fname):
+    """A path for a new report file named ``fname``.
+
+    Each render gets its own temporary directory, so two renders of the same
+    report never write to one file, and the upload keeps the plain name.
+    """
+    return os.path.join(tempfile.mkdtemp(prefix="report-"), fname)
+
+
+def write_workbook(path, sheets):
+    """Write ``[(title, header, rows), ...]`` to an .xlsx file row by row.
+
+    ``rows`` may be any iterable (e.g. a db cursor generator); the
+    write-only workbook flushes rows to disk as they are appended. The file
+    is written under a temporary name and renamed to ``path`` when complete.
+    """
+    wb = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        ws = wb.create_sheet(title)
+        header_cells = []
+        for value in header:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font, cell.border, cell.alignment = _HEADER_FONT, _HEADER_BORDER, _HEADER_ALIGN
+            header_cells.append(cell)
+        ws.append(header_cells)
+        for row in rows:
+            ws.append(row)
+    part = path + ".part"
+    try:
+        wb.save(part)
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+
+
+# ======================
+# 📊 Monthly Report
+# ======================
+def build_monthly_report(now: datetime):
+    """Build the current-month report.
+
+    Returns (text, excel_path), or None when the month has no entries.
+    """
+    month_start = datetime(now.year, now.month, 1)
+    month_end = datetime(now.year + now.month // 12, now.month % 12 + 1, 1)
+
+    totals = _totals(month_start, month_end)
+    if not totals:
+        return None
+
+    by_day = _sum_by(totals, 0)
+    by_day_worker = _sum_by(totals, 0, 1)
+    by_worker = _sum_by(totals, 1)
+    by_model = _sum_by(totals, 2)
+    by_worker_model = _sum_by(totals, 1, 2)
+    workers_per_day = _nest(by_day_worker)
+    models_per_day_worker = _nest({((d, w), m): q for (d, w, m), q in totals.items()})
+
+    # =================== TEXT OUTPUT ===================
+    text_lines = [f"📊 Ishlab chiqarish hisobot — {now.strftime('%B %Y')}\n"]
+
+    for (day,) in sorted(by_day):
+        kun = int(day[-2:])
+        text_lines.append(f"📅 {kun}-kun — Jami: {by_day[(day,)]} dona")
+        for (worker,), wtot in _desc(workers_per_day[day]):
+            text_lines.append(f"  👤 {worker}: {wtot} dona")
+            for (model,), mqty in models_per_day_worker[(day, worker)]:
+                text_lines.append(f"    • {model}: {mqty} dona")
+        text_lines.append("")
+
+    worker_month = _desc(sorted((w, q) for (w,), q in by_worker.items()))
+    text_lines.append("📈 Oylik jami (ishchi bo‘yicha):")
+    for worker, qty in worker_month:
+        text_lines.append(f"  👤 {worker}: {qty} dona")
+
+    model_month = _desc(sorted((m, q) for (m,), q in by_model.items()))
+    text_lines.append("\n📦 Oylik jami (model bo‘yicha):")
+    for model, qty in model_month:
+        text_lines.append(f"  • {model}: {qty} dona")
+
+    total_month = sum(totals.values())
+    text_lines.append(f"\n🧾 Umumiy jami (oy): {total_month} dona")
+
+    # =================== EXCEL OUTPUT ===================
+    raw_rows = (
+        (r["id"], _label(r["name"], NO_NAME), _label(r["production_type"], NO_MODEL), r["quantity"],
+         _format_date(r["date"]))
+        for r in db.iter_productions_between(month_start, month_end)
+    )
+    daily_wm = [(int(d[-2:]), w, m, q) for (d, w, m), q in sorted(totals.items())]
+    daily_ws = sorted(((int(d[-2:]), w, q) for (d, w), q in by_day_worker.items()), key=lambda r: (r[0], -r[2]))
+    worker_model_month = [(w, m, q) for (w, m), q in sorted(by_worker_model.items())]
+
+    path = report_path(f"Barcha_Malumotlar_{now.strftime('%Y-%m')}.xlsx")
+    with metrics.REPORT_SECONDS.time("monthly", "excel"):
+        write_workbook(path, [
+            ("Xom", ["ID", "Ishchi", "Model", "Soni", "Sana"], raw_rows),
+            ("Kunlik_Ishchi_Model", ["Kun", "Ishchi", "Model", "Soni"], daily_wm),
+            ("Kunlik_Ishchi_Jami", ["Kun", "Ishchi", "JamiSoni"], daily_ws),
+            ("Oylik_Ishchi_Jami", ["Ishchi", "Soni"], worker_month),
+            ("Oylik_Model_Jami", ["Model", "Soni"], model_month),
+            ("Oylik_Ishchi_Model", ["Ishchi", "Model", "Soni"], worker_model_month),
+        ])
+
+    return "\n".join(text_lines), path
+
+
+# ======================
+# 🗓 Daily Report
+# ======================
+def build_daily_report(today):
+    """Build the report for one Tashkent calendar day.
+
+    Returns (text, excel_path), or None when the day has no entries.
+    """
+    day_start, day_end = today, today + timedelta(days=1)
+
+    totals = _totals(day_start, day_end)
+    if not totals:
+        return None
+
+    by_worker_model = _sum_by(totals, 1, 2)
+    by_worker = _sum_by(totals, 1)
+    models_per_worker = _nest(by_worker_model)
+
+    # Text output
+    text_lines = [f"📊 **Kunlik Ishlab Chiqarish Hisoboti — {today.strftime('%d.%m.%Y')}**\n"]
+
+    for worker in sorted(models_per_worker):
+        text_lines.append(f"👤 {worker}:")
+        for (model,), qty in models_per_worker[worker]:
+            text_lines.append(f"    • {model}: {qty} dona")
+        text_lines.append(f"  🔹 Jami: {by_worker[(worker,)]} dona\n")
+
+    total_qty = sum(totals.values())
+    text_lines.append(f"🛠 **Umumiy kunlik jami**: {total_qty} dona")
+
+    # Excel output
+    raw_rows = (
+        (r["id"], _label(r["name"], NO_NAME), _label(r["production_type"], NO_MODEL), r["quantity"],
+         _format_date(r["date"], "%Y-%m-%d %H:%M"), r["model"])
+        for r in db.iter_productions_between(day_start, day_end)
+    )
+
+    path = report_path(f"Kunlik_Hisobot_{today.strftime('%Y-%m-%d')}.xlsx")
+    with metrics.REPORT_SECONDS.time("daily", "excel"):
+        write_workbook(path, [
+            ("Xom Ma'lumot", ["id", "👤 Ishchi", "📦 Model", "🔢 Miqdor", "📅 Sana", "model"], raw_rows),
+            ("Ishchi_Model", ["Ishchi", "Model", "Soni"], [(w, m, q) for (w, m), q in sorted(by_worker_model.items())]),
+            ("Ishchi_Kunlik_Jami", ["Ishchi", "Kunlik Jami"], [(w, q) for (w,), q in sorted(by_worker.items())]),
+        ])
+
+    return "\n".join(text_lines), path
@@ -0,0 +1,254 @@
+"""Bot conversation sessions: a bounded in-memory tier over a persistent backend.
+
+Handlers keep working with ``sess["state"]``-style access, but a session is
+a small ``__slots__`` object with a fixed set of fields rather than a free
+form dict. The store keeps recently active sessions in an LRU bounded by
+count and idle time; everything else lives only in the backend (the
+``sessions`` SQLite table by default) and is loaded again on the user's
+next update, so a restart or an eviction does not log anyone out.
+
+The router entry points open ``active(user_id)`` around a handler: it loads
+the sender's session, keeps it pinned in memory while the handler runs and
+flushes it afterwards. Handlers only use the synchronous, memory-only
+accessors in between, and eviction never drops a pinned session, so what a
+long handler (e.g. a file import) writes to it is not lost.
+
+When several processes serve the same bot (webhook mode behind one port),
+a user's next update may reach another process, so a store created with
+``shared=True`` re-reads the session from the backend on every ``load``
+instead of trusting its memory copy.
+"""
+import json
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+
+import db
+
+
+class Session:
+    FIELDS = (
+        "state", "username", "name", "is_admin", "worker_id",
+        "production_type", "quantity", "batch", "editing", "mold_query",
+        "new_user_name", "new_user_username",
+    )
+    __slots__ = FIELDS + ("user_id", "touched", "dirty")
+
+    def __init__(self, user_id, **fields):
+        self.user_id = user_id
+        self.touched = time.monotonic()
+        self.dirty = True
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        for key, value in fields.items():
+            self[key] = value
+
+    # Mapping-style access; an unset (None) field behaves like a missing key
+    def __getitem__(self, key):
+        value = getattr(self, key) if key in self.FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        self.dirty = True
+
+    def __contains__(self, key):
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        if key in self.FIELDS and getattr(self, key) is not None:
+            setattr(self, key, None)
+            self.dirty = True
+        return value
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def to_json(self):
+        return json.dumps(
+            {f: getattr(self, f) for f in self.FIELDS if getattr(self, f) is not None},
+            ensure_ascii=False, separators=(",", ":")
+        )
+
+    @classmethod
+    def from_json(cls, user_id, data):
+        fields = json.loads(data)
+        sess = cls(user_id, **{k: v for k, v in fields.items() if k in cls.FIELDS})
+        sess.dirty = False
+        return sess
+
+    def refresh(self, data):
+        """Replace all fields with the stored copy ``data``."""
+        fields = json.loads(data)
+        for field in self.FIELDS:
+            setattr(self, field, fields.get(field))
+        self.dirty = False
+
+
+class SqliteSessionBackend:
+    """Sessions in the bot database's ``sessions`` table."""
+
+    async def load(self, user_id):
+        return await db.aload_session(user_id)
+
+    async def save(self, user_id, data):
+        await db.asave_session(user_id, data)
+
+    async def delete(self, user_id):
+        await db.adelete_session(user_id)
+
+    async def purge(self, max_age):
+        return await db.apurge_sessions(max_age)
+
+
+class MemorySessionBackend:
+    """Process-local stand-in with the same interface (tests, throwaway runs).
+
+    Any key-value store with get/set/delete (e.g. Redis) fits the same shape.
+    """
+
+    def __init__(self):
+        self._data = {}
+
+    async def load(self, user_id):
+        entry = self._data.get(user_id)
+        return entry[0] if entry else None
+
+    async def save(self, user_id, data):
+        self._data[user_id] = (data, time.time())
+
+    async def delete(self, user_id):
+        self._data.pop(user_id, None)
+
+    async def purge(self, max_age):
+        cutoff = time.time() - max_age
+        stale = [uid for uid, (_, updated) in self._data.items() if updated < cutoff]
+        for uid in stale:
+            del self._data[uid]
+        return len(stale)
+
+
+class SessionStore:
+    def __init__(self, backend, max_entries=2000, idle_ttl=30 * 60, shared=False):
+        self.backend = backend
+        self.shared = shared
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._deleted = set()
+        self._pinned = Counter()  # user_id -> handlers currently using the session
+
+    # ---------- memory tier (synchronous, used by handlers) ----------
+    def get(self, user_id, default=None):
+        return self._sessions.get(user_id, default)
+
+    def __getitem__(self, user_id):
+        return self._sessions[user_id]
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def new(self, user_id, **fields):
+        """Start a fresh session for ``user_id``, replacing any existing one."""
+        sess = Session(user_id, **fields)
+        self._deleted.discard(user_id)
+        self._remember(sess)
+        return sess
+
+    def pop(self, user_id, default=None):
+        """Forget a session (logout); the stored copy is deleted on flush."""
+        self._deleted.add(user_id)
+        return self._sessions.pop(user_id, default)
+
+    # ---------- backend tier ----------
+    @asynccontextmanager
+    async def active(self, user_id):
+        """Load the user's session for one update and flush it afterwards.
+
+        The session stays resident (it is not evicted) until the block exits.
+        """
+        self._pinned[user_id] += 1
+        try:
+            yield await self.load(user_id)
+        finally:
+            try:
+                await self.flush(user_id)
+            finally:
+                self._pinned[user_id] -= 1
+                if not self._pinned[user_id]:
+                    del self._pinned[user_id]
+
+    async def load(self, user_id):
+        """Make the user's session resident and return it (None if there is none)."""
+        self._expire()
+        sess = self._sessions.get(user_id)
+        if sess is None or (self.shared and not sess.dirty):
+            data = await self.backend.load(user_id)
+            current = self._sessions.get(user_id)
+            if current is not None and current.dirty:
+                # The user sent /start (or another update) while we were waiting
+                sess = current
+            elif data is None:
+                self._sessions.pop(user_id, None)
+                return None
+            elif current is not None:
+                # Update in place: a handler still running may hold this object
+                current.refresh(data)
+                sess = current
+            else:
+                sess = Session.from_json(user_id, data)
+        self._remember(sess)
+        return sess
+
+    async def flush(self, user_id):
+        """Persist whatever the last handler did to this user's session."""
+        if user_id in self._deleted:
+            self._deleted.discard(user_id)
+            if user_id not in self._sessions:
+                await self.backend.delete(user_id)
+                return
+        sess = self._sessions.get(user_id)
+        if sess is not None and sess.dirty:
+            sess.dirty = False
+            await self.backend.save(user_id, sess.to_json())
+
+    async def purge(self, max_age):
+        return await self.backend.purge(max_age)
+
+    def _remember(self, sess):
+        sess.touched = time.monotonic()
+        self._sessions[sess.user_id] = sess
+        self._sessions.move_to_end(sess.user_id)
+        while len(self._sessions) > self.max_entries:
+            # Least recently used first, skipping sessions a handler is using
+            victim = next((uid for uid in self._sessions if uid not in self._pinned), None)
+            if victim is None:
+                break
+            del self._sessions[victim]
+
+    def _expire(self):
+        # LRU order is last-touch order, so idle sessions are at the front.
+        # Sessions are flushed after every update, so dropping one from
+        # memory loses nothing; it is reloaded from the backend when needed.
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = []
+        for uid, sess in self._sessions.items():
+            if sess.touched >= cutoff:
+                break
+            if uid not in self._pinned:
+                idle.append(uid)
+        for uid in idle:
+            del self._sessions[uid]
@@ -0,0 +1,89 @@
+"""Dictionary-based routing for the bot's reply-keyboard flows.
+
+Instead of registering one aiogram handler per state with a lambda filter
+(tested one by one, in registration order, for every message), handlers
+are stored in dicts keyed by button text, session state and callback
+prefix. Resolving an update is a couple of dict lookups no matter how
+many flows exist.
+
+Precedence for a text message:
+  1. the handler for the sender's current state, if that state was
+     registered with ``exclusive=True`` (the login prompts: a password must
+     not be skippable by pressing a menu button);
+  2. a button handler for the (normalized) text;
+  3. the handler for the sender's current session state;
+  4. the fallback.
+Messages without text (documents, photos) only reach state handlers
+registered with ``media=True``.
+"""
+import re
+
+# Apostrophe look-alikes users (and keyboards) type in Uzbek words
+_APOSTROPHES = re.compile(r"['‘’`ʼ]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Canonical form of button text: one apostrophe style, single spaces."""
+    if text is None:
+        return ""
+    return _SPACES.sub(" ", _APOSTROPHES.sub("'", text)).strip()
+
+
+class StateRouter:
+    def __init__(self):
+        self._buttons = {}
+        self._states = {}
+        self._media_states = {}
+        self._exclusive_states = set()
+        self._callbacks = {}
+        self._fallback = None
+
+    # ---------- registration ----------
+    def button(self, *texts):
+        """Handle these reply-keyboard texts in any state."""
+        def register(handler):
+            for text in texts:
+                self._buttons[normalize(text)] = handler
+            return handler
+        return register
+
+    def state(self, *states, media=False, exclusive=False):
+        """Handle free input while the session is in one of ``states``.
+
+        In an ``exclusive`` state every text message goes to ``handler``,
+        button texts included.
+        """
+        def register(handler):
+            for state in states:
+                self._states[state] = handler
+                if media:
+                    self._media_states[state] = handler
+                if exclusive:
+                    self._exclusive_states.add(state)
+            return handler
+        return register
+
+    def callback(self, *prefixes):
+        """Handle inline callbacks whose data is ``prefix`` or starts with ``prefix:``."""
+        def register(handler):
+            for prefix in prefixes:
+                self._callbacks[prefix] = handler
+            return handler
+        return register
+
+    def fallback(self, handler):
+        self._fallback = handler
+        return handler
+
+    # ---------- lookup ----------
+    def resolve_message(self, state, text):
+        if text is None:
+            return self._media_states.get(state, self._fallback)
+        if state in self._exclusive_states:
+            return self._states[state]
+        return self._buttons.get(normalize(text)) or self._states.get(state) or self._fallback
+
+    def resolve_callback(self, data):
+        prefix = (data or "").split(":", 1)[0]
+        return self._callbacks.get(prefix)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Point db at a fresh factory.db in a temporary directory."""
+    path = str(tmp_path / "factory.db")
+    db.close_all()
+    monkeypatch.setattr(db, "DB_NAME", path)
+    yield path
+    db.close_all()
+
+
+@pytest.fixture
+def bot_app(db_path, monkeypatch):
+    """main.py on a fresh database, with empty in-memory session and mold caches."""
+    from benchmarks.fakes import FAKE_TOKEN
+
+    monkeypatch.setenv("BOT_TOKEN", FAKE_TOKEN)
+    monkeypatch.setenv("PREWARM_REPORTS", "0")
+    import main
+    from mold_catalog import MoldCatalog
+    from sessions import SessionStore, SqliteSessionBackend
+
+    db.init_db()
+    monkeypatch.setattr(main, "user_sessions", SessionStore(SqliteSessionBackend()))
+    monkeypatch.setattr(main, "mold_catalog", MoldCatalog())
+    return main
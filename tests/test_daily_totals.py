@@ -0,0 +1,78 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import db
+
+
+def raw_totals():
+    """production_daily_totals as computed from scratch in Python."""
+    qty, entries = Counter(), Counter()
+    for date, worker_id, mold_id, name, mold, quantity in db.connect().execute(
+        "SELECT date, worker_id, mold_id, name, production_type, quantity FROM productions"
+    ):
+        if date is None:
+            continue
+        key = (
+            db.from_epoch(date).strftime("%Y-%m-%d"),
+            worker_id or 0,
+            mold_id or 0,
+            "" if worker_id else (name or ""),
+            "" if mold_id else (mold or ""),
+        )
+        qty[key] += quantity or 0
+        entries[key] += 1
+    return {key: (qty[key], entries[key]) for key in entries}
+
+
+def rollup():
+    return {
+        row[:5]: row[5:]
+        for row in db.connect().execute(
+            "SELECT day, worker_id, mold_id, worker, mold, qty, entries FROM production_daily_totals"
+        )
+    }
+
+
+def test_rollup_follows_every_write(db_path):
+    db.init_db()
+    db.add_user("ali", "pw", "Ali")
+    db.add_user("vali", "pw", "Vali")
+    for mold in ("Qolip 1", "Qolip 2"):
+        db.add_mold(mold)
+    start = datetime(2024, 3, 1, 23, 30)  # near midnight, Tashkent time
+
+    def check():
+        assert rollup() == raw_totals()
+
+    ids = [
+        db.save_production({"name": name, "production_type": mold, "quantity": q,
+                            "date": start + timedelta(minutes=45 * q)})
+        for q, (name, mold) in enumerate([
+            ("Ali", "Qolip 1"), ("ali", "qolip 1"), ("Vali", "Qolip 2"),
+            ("Begona", "Qolip 1"), ("Ali", "Noma'lum"), ("Vali", "Qolip 1"),
+        ], start=1)
+    ]
+    check()
+    assert rollup()
+
+    db.update_production(ids[0], {"quantity": 10})
+    check()
+    db.update_production(ids[1], {"date": start + timedelta(days=3)})
+    check()
+    db.update_production(ids[2], {"production_type": "Qolip 1"})
+    check()
+    db.update_production(ids[3], {"name": "Vali"})
+    check()
+
+    db.delete_production(ids[5])
+    check()
+
+    db.update_user("ali", {"name": "Ali Valiyev"})
+    check()
+    db.delete_user("vali")
+    check()
+    db.remove_mold("Qolip 1")
+    check()
+
+    db.rebuild_daily_totals()
+    check()
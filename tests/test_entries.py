@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import db
+
+
+def add_entries(worker_id):
+    start = datetime(2024, 3, 1, 8, 0)
+    # Entered live: ids follow the dates
+    for day in range(10, 20):
+        db.save_production({"name": "Ali", "production_type": "Qolip 1", "quantity": day,
+                            "date": start + timedelta(days=day), "worker_id": worker_id})
+    # Imported history: higher ids, older dates (one of them unparsed)
+    for day in range(0, 10):
+        db.save_production({"name": "Ali", "production_type": "Qolip 1", "quantity": day,
+                            "date": start + timedelta(days=day), "worker_id": worker_id})
+    db.save_production({"name": "Ali", "production_type": "Qolip 1", "quantity": -1,
+                        "date": None, "worker_id": worker_id})
+
+
+def walk(worker_id, limit, direction="older", key=None):
+    pages = []
+    while True:
+        if direction == "older":
+            page = db.get_productions_for_worker(worker_id, limit, before=key)
+            key = (page[-1]["date"], page[-1]["id"]) if page else None
+        else:
+            page = db.get_productions_for_worker(worker_id, limit, after=key)
+            key = (page[0]["date"], page[0]["id"]) if page else None
+        if not page:
+            return pages
+        pages.append([r["quantity"] for r in page])
+
+
+def test_entries_newest_first_by_date(db_path):
+    db.init_db()
+    db.add_user("ali", "pw", "Ali")
+    worker_id = db.get_user("ali")["id"]
+    add_entries(worker_id)
+
+    first = db.get_productions_for_worker(worker_id, 5)
+    assert [r["quantity"] for r in first] == [19, 18, 17, 16, 15]
+
+    pages = walk(worker_id, 6)
+    assert sum(pages, []) == list(range(19, -1, -1)) + [-1]
+
+    # And back up from the oldest entry; each page is still newest first
+    last = db.get_productions_for_worker(worker_id, 100)[-1]
+    newer = walk(worker_id, 6, "newer", (last["date"], last["id"]))
+    assert sum(reversed(newer), []) == list(range(19, -1, -1))
+
+
+def test_entries_use_the_worker_index(db_path):
+    db.init_db()
+    plan = db.connect().execute("""
+        EXPLAIN QUERY PLAN
+        SELECT p.id FROM productions p
+        WHERE p.worker_id = 1 AND (IFNULL(p.date, 0), p.id) < (5, 5)
+        ORDER BY IFNULL(p.date, 0) DESC, p.id DESC LIMIT 11
+    """).fetchall()
+    text = " ".join(row[-1] for row in plan)
+    assert "idx_productions_worker_date" in text
+    assert "TEMP B-TREE" not in text
@@ -0,0 +1,119 @@
+import csv
+
+import pytest
+
+import db
+import importer
+
+HEADER = ["Ishchi", "Qolip", "Soni", "Sana"]
+
+
+def write_csv(tmp_path, rows, header=HEADER):
+    path = tmp_path / "import.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture
+def factory(db_path):
+    db.init_db()
+    db.add_user("ali", "pw", "Ali Valiyev")
+    # users.name is nullable; such a user must not break the import
+    db.add_user("nameless", "pw", None)
+    db.add_mold("Qolip 1")
+    return db.get_user("ali")["id"], db.get_user("nameless")["id"]
+
+
+def imported():
+    return db.connect().execute(
+        "SELECT worker_id, name, production_type, quantity, date FROM productions ORDER BY id"
+    ).fetchall()
+
+
+def test_imports_rows(tmp_path, factory):
+    ali, nameless = factory
+    path = write_csv(tmp_path, [
+        ["ali valiyev", "qolip 1", "5", "2024-03-01 08:30"],
+        ["NAMELESS", "Qolip 1", "3", "01.03.2024"],
+    ])
+
+    stats = importer.import_productions(path)
+
+    assert (stats.read, stats.inserted, stats.skipped) == (2, 2, 0)
+    assert imported() == [
+        (ali, "Ali Valiyev", "Qolip 1", 5, db.to_epoch("2024-03-01 08:30")),
+        (nameless, "nameless", "Qolip 1", 3, db.to_epoch("01.03.2024")),
+    ]
+
+
+def test_skips_bad_rows(tmp_path, factory):
+    path = write_csv(tmp_path, [
+        ["Begona", "Qolip 1", "5", "2024-03-01"],
+        ["ali", "Qolip 9", "5", "2024-03-01"],
+        ["ali", "Qolip 1", "besh", "2024-03-01"],
+        ["ali", "Qolip 1", "0", "2024-03-01"],
+        ["ali", "Qolip 1", "-2", "2024-03-01"],
+        ["ali", "Qolip 1", "5", "kecha"],
+        ["ali", "Qolip 1", "5", "2024-03-01"],
+    ])
+
+    stats = importer.import_productions(path)
+
+    assert (stats.read, stats.inserted, stats.skipped) == (7, 1, 6)
+    assert [n for n, _ in stats.errors] == [2, 3, 4, 5, 6, 7]
+    assert "ishchi topilmadi" in stats.errors[0][1]
+    assert "qolip topilmadi" in stats.errors[1][1]
+    assert "miqdor xato" in stats.errors[2][1]
+    assert "sana xato" in stats.errors[5][1]
+    assert len(imported()) == 1
+
+
+def test_unknown_workers_and_molds_when_allowed(tmp_path, factory):
+    path = write_csv(tmp_path, [["Begona", "Yangi qolip", "4", "2024-03-01"]])
+
+    stats = importer.import_productions(path, add_missing_molds=True, allow_unknown_workers=True)
+
+    assert (stats.inserted, stats.added_molds) == (1, 1)
+    worker_id, name, mold, _, _ = imported()[0]
+    assert (worker_id, name, mold) == (None, "Begona", "Yangi qolip")
+    assert "Yangi qolip" in db.get_all_molds()
+
+
+def test_dry_run_writes_nothing(tmp_path, factory):
+    path = write_csv(tmp_path, [
+        ["ali", "Qolip 1", "5", "2024-03-01"],
+        ["ali", "Yangi qolip", "5", "2024-03-01"],
+    ])
+    version = db.get_data_version()
+
+    stats = importer.import_productions(path, add_missing_molds=True, dry_run=True)
+
+    assert (stats.inserted, stats.added_molds) == (2, 1)
+    assert imported() == []
+    assert "Yangi qolip" not in db.get_all_molds()
+    assert db.get_data_version() == version
+
+
+def test_chunks(tmp_path, factory):
+    path = write_csv(tmp_path, [["ali", "Qolip 1", str(n), "2024-03-01"] for n in range(1, 6)])
+    progress = []
+
+    def on_progress(stats):
+        # Each chunk is committed before progress is reported
+        progress.append((stats.inserted, len(imported())))
+
+    stats = importer.import_productions(path, chunk_size=2, progress=on_progress)
+
+    assert stats.inserted == 5
+    assert progress == [(2, 2), (4, 4), (5, 5)]
+    assert [r[3] for r in imported()] == [1, 2, 3, 4, 5]
+
+
+def test_missing_columns(tmp_path, factory):
+    path = write_csv(tmp_path, [["ali", "5"]], header=["Ishchi", "Soni"])
+
+    with pytest.raises(importer.ImportFailed):
+        importer.import_productions(path)
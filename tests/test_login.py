@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime
+
+import db
+from benchmarks.fakes import callback_update, fake_bot, message_update
+
+ALI = 501
+
+
+def add_ali():
+    db.add_user("ali", "secret", "Ali Valiyev")
+    return db.save_production({
+        "name": "Ali Valiyev", "production_type": "Qolip 1", "quantity": 5,
+        "date": datetime(2024, 3, 1, 9, 0),
+    })
+
+
+def replies(bot):
+    return [getattr(m, "text", None) for m in bot.session.sent]
+
+
+async def send(app, bot, *texts, user_id=ALI):
+    for text in texts:
+        await app.dp.feed_update(bot, message_update(bot, user_id, text))
+
+
+def test_buttons_cannot_skip_the_password(bot_app):
+    add_ali()
+
+    async def run():
+        bot = fake_bot()
+        await send(bot_app, bot, "/start", "ali", "⚙ Profilni Tahrirlash", "Hacked")
+        return bot
+
+    bot = asyncio.run(run())
+    assert db.get_user("ali")["name"] == "Ali Valiyev"
+    # The button text was taken as a (wrong) password
+    assert any(t and t.startswith("Kirish amalga oshmadi") for t in replies(bot))
+
+
+def test_menu_buttons_need_a_login(bot_app):
+    add_ali()
+    buttons = ("📝 Mening Yozuvlarim", "➕ Ishlab chiqarishni Qo‘shish", "📋 Qoliplar",
+               "⚙ Profilni Tahrirlash", "📊 Barcha Ma'lumotlar")
+
+    async def run():
+        bot = fake_bot()
+        await send(bot_app, bot, *buttons)
+        return bot
+
+    bot = asyncio.run(run())
+    assert len(replies(bot)) == len(buttons)
+    assert set(replies(bot)) <= {"⚠️ Siz tizimga kirmagansiz.", "🚫 Ruxsat yo‘q."}
+
+
+def test_login_then_buttons(bot_app):
+    add_ali()
+
+    async def run():
+        bot = fake_bot()
+        await send(bot_app, bot, "/start", "ali", "secret", "📝 Mening Yozuvlarim")
+        return bot
+
+    bot = asyncio.run(run())
+    page = bot.session.sent[-1]
+    assert page.text.startswith("✏️")
+    assert len(page.reply_markup.inline_keyboard) == 1
+
+
+def test_entries_need_a_login(bot_app):
+    entry_id = add_ali()
+
+    async def run():
+        bot = fake_bot()
+        # Username typed, password not yet
+        await send(bot_app, bot, "/start", "ali")
+        for data in (f"delete:{entry_id}", f"edit:{entry_id}", f"edit_qty:{entry_id}"):
+            await bot_app.dp.feed_update(bot, callback_update(bot, ALI, data))
+        return bot
+
+    bot = asyncio.run(run())
+    assert db.get_production(entry_id) is not None
+    assert replies(bot)[-3:] == ["⚠️ Siz tizimga kirmagansiz."] * 3
+
+
+def test_own_entry_after_login(bot_app):
+    entry_id = add_ali()
+
+    async def run():
+        bot = fake_bot()
+        await send(bot_app, bot, "/start", "ali", "secret")
+        await bot_app.dp.feed_update(bot, callback_update(bot, ALI, f"delete:{entry_id}"))
+
+    asyncio.run(run())
+    assert db.get_production(entry_id) is None
+
+
+def test_entry_pages(bot_app):
+    add_ali()
+    for day in range(2, 14):
+        db.save_production({"name": "Ali Valiyev", "production_type": "Qolip 1", "quantity": day,
+                            "date": datetime(2024, 3, day, 9, 0)})
+
+    async def run():
+        bot = fake_bot()
+        await send(bot_app, bot, "/start", "ali", "secret", "📝 Mening Yozuvlarim")
+        older = bot.session.sent[-1].reply_markup.inline_keyboard[-1][0].callback_data
+        await bot_app.dp.feed_update(bot, callback_update(bot, ALI, older))
+        return bot, older
+
+    bot, older = asyncio.run(run())
+    assert older.startswith("entries:older:")
+    rows = bot.session.sent[-2].reply_markup.inline_keyboard
+    # 13 entries: the second page has the oldest three and a ▶ button
+    assert [r[0].text.split(" ×")[1].split(" |")[0] for r in rows[:-1]] == ["3", "2", "5"]
@@ -0,0 +1,148 @@
+import sqlite3
+from datetime import datetime
+
+import db
+
+# factory.db as the bot created it before schema versioning
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    username TEXT PRIMARY KEY,
+    password TEXT,
+    name TEXT,
+    is_admin INTEGER DEFAULT 0,
+    blocked INTEGER DEFAULT 0,
+    telegram_id INTEGER
+);
+CREATE TABLE productions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    production_type TEXT,
+    quantity INTEGER,
+    date TEXT,
+    model TEXT
+);
+CREATE TABLE molds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE
+);
+"""
+
+USERS = [
+    ("admin", "pw", "Admin", 1, 0, 111),
+    ("ali", "pw", "Ali Valiyev", 0, 0, 222),
+    ("vali", "pw", "Vali", 0, 1, None),
+]
+MOLDS = ["Qolip 1", "Qolip 2"]
+PRODUCTIONS = [
+    ("Ali Valiyev", "Qolip 1", 10, "2024-03-01 08:30:00", None),
+    ("Ali Valiyev", "Qolip 2", 5, "2024-03-01", "M-2"),
+    ("Vali", "Qolip 1", 7, "01.03.2024", None),
+    ("Vali", "qolip 2", 3, "2024-02-29 23:59:59", None),
+]
+# Dates no legacy format matches; their text must survive the migration
+UNPARSEABLE = [
+    ("Vali", "Qolip 1", 2, "kecha", None),
+    ("Ali Valiyev", "Qolip 1", 1, "31/12/2023", None),
+]
+
+
+def make_baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)", USERS)
+    conn.executemany("INSERT INTO molds (name) VALUES (?)", [(m,) for m in MOLDS])
+    conn.executemany(
+        "INSERT INTO productions (name, production_type, quantity, date, model) VALUES (?, ?, ?, ?, ?)",
+        PRODUCTIONS,
+    )
+    conn.commit()
+    conn.close()
+
+
+def local_epoch(*args):
+    return int(datetime(*args, tzinfo=db.LOCAL_TZ).timestamp())
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return list(conn.iterdump())
+    finally:
+        conn.close()
+
+
+def test_migrates_baseline_db(db_path):
+    make_baseline_db(db_path)
+    db.init_db()
+    conn = db.connect()
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        "idx_productions_date",
+        "idx_productions_worker_date",
+        "idx_productions_mold_id",
+        "idx_users_username_nocase",
+        "idx_users_name_nocase",
+        "idx_molds_name_nocase",
+    } <= indexes
+    assert "idx_productions_worker_id" not in indexes
+
+    rows = conn.execute("SELECT id, date, typeof(date), worker_id, mold_id FROM productions ORDER BY id").fetchall()
+    assert [r[1] for r in rows] == [
+        local_epoch(2024, 3, 1, 8, 30),
+        local_epoch(2024, 3, 1),
+        local_epoch(2024, 3, 1),
+        local_epoch(2024, 2, 29, 23, 59, 59),
+    ]
+    assert {r[2] for r in rows} == {"integer"}
+
+    user_ids = dict(conn.execute("SELECT username, id FROM users"))
+    mold_ids = dict(conn.execute("SELECT name, id FROM molds"))
+    assert [(r[3], r[4]) for r in rows] == [
+        (user_ids["ali"], mold_ids["Qolip 1"]),
+        (user_ids["ali"], mold_ids["Qolip 2"]),
+        (user_ids["vali"], mold_ids["Qolip 1"]),
+        (user_ids["vali"], mold_ids["Qolip 2"]),
+    ]
+
+    totals = conn.execute("SELECT SUM(qty), SUM(entries) FROM production_daily_totals").fetchone()
+    assert totals == (25, 4)
+
+
+def test_keeps_unparseable_dates(db_path, caplog):
+    make_baseline_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO productions (name, production_type, quantity, date, model) VALUES (?, ?, ?, ?, ?)",
+        UNPARSEABLE,
+    )
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level("WARNING", logger="db"):
+        db.init_db()
+
+    rows = db.connect().execute("SELECT id, date, date_text FROM productions ORDER BY id").fetchall()
+    assert [r[1:] for r in rows[-2:]] == [(None, "kecha"), (None, "31/12/2023")]
+    assert all(r[2] is None for r in rows[:-2])
+    assert "ids 5, 6" in caplog.text
+
+
+def test_init_db_is_idempotent(db_path):
+    make_baseline_db(db_path)
+    db.init_db()
+    before = dump(db_path)
+
+    db.init_db()
+
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert dump(db_path) == before
+
+
+def test_fresh_db(db_path):
+    db.init_db()
+
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.get_all_users() == {}
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+import db
+
+
+def entry(quantity, **extra):
+    return {"name": "Ali", "production_type": "Qolip 1", "quantity": quantity,
+            "date": datetime(2024, 3, 1, 9, 0), **extra}
+
+
+@pytest.fixture
+def writer(db_path, monkeypatch):
+    """A ProductionWriter whose first commit waits until ``release`` is set.
+
+    While it waits, later submits queue up behind it. ``groups`` records the
+    groups passed to each commit_productions call (one call, one transaction).
+    """
+    db.init_db()
+    started, release = threading.Event(), threading.Event()
+    groups, synchronous = [], set()
+    commit = db.commit_productions
+
+    def recording_commit(batch):
+        groups.append([len(rows) for rows in batch])
+        synchronous.add(db.connect().execute("PRAGMA synchronous").fetchone()[0])
+        if len(groups) == 1:
+            started.set()
+            release.wait(5)
+        return commit(batch)
+
+    monkeypatch.setattr(db, "commit_productions", recording_commit)
+    w = db.ProductionWriter(window=0.05)
+    w.started, w.release, w.groups, w.synchronous = started, release, groups, synchronous
+    yield w
+    release.set()
+    w.close()
+
+
+def block(writer):
+    """Submit one entry and wait until the writer is busy committing it."""
+    first = writer.submit([entry(1)])
+    assert writer.started.wait(5)
+    return first
+
+
+def count():
+    return db.connect().execute("SELECT COUNT(*) FROM productions").fetchone()[0]
+
+
+def test_concurrent_submits_share_one_transaction(writer):
+    first = block(writer)
+    futures = [writer.submit([entry(n), entry(n)]) for n in range(2, 12)]
+    writer.release.set()
+
+    ids = [f.result(5) for f in futures]
+
+    assert first.result(5) and writer.groups == [[1], [2] * 10]
+    # Each caller gets the ids of its own entries
+    assert all(len(i) == 2 for i in ids)
+    assert len({i for pair in ids for i in pair}) == 20
+    # Acknowledged only once synced to disk
+    assert writer.synchronous == {2}  # FULL
+    rows = dict(db.connect().execute("SELECT id, quantity FROM productions"))
+    assert all(rows[a] == rows[b] == n for (a, b), n in zip(ids, range(2, 12)))
+
+
+def test_error_reaches_only_its_waiter(writer):
+    block(writer)
+    good = [writer.submit([entry(2)]), writer.submit([entry(3)])]
+    bad = writer.submit([{"quantity": 4}])  # no name, mold or date
+    good.append(writer.submit([entry(5)]))
+    writer.release.set()
+
+    with pytest.raises(KeyError):
+        bad.result(5)
+    assert all(len(f.result(5)) == 1 for f in good)
+    # The failed group transaction was rolled back, then each retried alone
+    assert count() == 4
+
+
+def test_close_drains_the_queue(writer):
+    block(writer)
+    futures = [writer.submit([entry(n)]) for n in range(2, 50)]
+    writer.release.set()
+    writer.close()
+
+    assert all(f.done() and not f.exception() for f in futures)
+    assert count() == 49
+
+
+def test_submit_after_close_restarts(writer):
+    writer.release.set()
+    assert writer.submit([entry(1)]).result(5)
+    writer.close()
+    assert writer.submit([entry(2)]).result(5)
+    assert count() == 2
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+import db
+from benchmarks.fakes import fake_bot, message_update
+from render_service import RenderBusy, RenderService
+
+
+def test_check_refuses_only_new_keys():
+    async def run():
+        service = RenderService(max_pending=1)
+        gate = asyncio.Event()
+
+        async def fake_run(*args):
+            await gate.wait()
+            return "done"
+
+        service._run = fake_run
+        first = asyncio.ensure_future(service.render("a", None))
+        await asyncio.sleep(0)
+        # Joining the running render is fine; a second distinct one is not
+        service.check("a")
+        with pytest.raises(RenderBusy):
+            service.check("b")
+        joined = asyncio.ensure_future(service.render("a", None))
+        gate.set()
+        assert await first == await joined == "done"
+        service.check("b")
+
+    asyncio.run(run())
+
+
+def test_busy_report_is_refused_without_the_wait_message(bot_app, monkeypatch):
+    db.add_user("admin", "pw", "Admin", is_admin=True)
+    monkeypatch.setattr(bot_app, "render_service", RenderService(max_pending=0))
+
+    async def run():
+        bot = fake_bot()
+        for text in ("/start", "admin", "pw", "🗓 Kunlik Hisobot"):
+            await bot_app.dp.feed_update(bot, message_update(bot, 7, text))
+        return [m.text for m in bot.session.sent]
+
+    sent = asyncio.run(run())
+    assert sent[-1] == bot_app.RENDER_BUSY_TEXT
+    assert not any(t.startswith("⏳") for t in sent)
@@ -0,0 +1,45 @@
+import os
+
+from report_cache import ReportCache
+
+
+def make_file(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"x" * 10)
+    return str(path)
+
+
+def test_put_keeps_newer_version(tmp_path):
+    cache = ReportCache()
+    newer = cache.put(("daily", "2024-03-01", 7), ["v7"], make_file(tmp_path, "v7.xlsx"))
+    # A render of an older version that finishes late
+    cache.put(("daily", "2024-03-01", 5), ["v5"], make_file(tmp_path, "v5.xlsx"))
+
+    assert cache.get(("daily", "2024-03-01", 7)) is newer
+
+
+def test_put_replaces_older_versions(tmp_path):
+    cache = ReportCache()
+    cache.put(("daily", "2024-03-01", 5), ["v5"], make_file(tmp_path, "v5.xlsx"))
+    cache.put(("daily", "2024-03-02", 5), ["other day"], make_file(tmp_path, "d2.xlsx"))
+    cache.put(("daily", "2024-03-01", 7), ["v7"], make_file(tmp_path, "v7.xlsx"))
+
+    assert cache.get(("daily", "2024-03-01", 5)) is None
+    assert cache.get(("daily", "2024-03-02", 5)) is not None
+    assert len(cache) == 2
+
+
+def test_dropped_files_removed_after_grace(tmp_path):
+    cache = ReportCache(file_grace=3600)
+    old = make_file(tmp_path, "v5.xlsx")
+    cache.put(("monthly", "2024-03", 5), ["v5"], old)
+    cache.put(("monthly", "2024-03", 6), ["v6"], make_file(tmp_path, "v6.xlsx"))
+    # Someone may still be uploading it
+    assert os.path.exists(old)
+
+    cache.file_grace = 0
+    cache.put(("monthly", "2024-04", 6), ["april"], make_file(tmp_path, "april.xlsx"))
+    assert not os.path.exists(old)
+
+    cache.close()
+    assert not list(tmp_path.iterdir())
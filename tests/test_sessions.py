@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from sessions import MemorySessionBackend, SessionStore
+
+
+def test_active_session_survives_eviction():
+    async def run():
+        backend = MemorySessionBackend()
+        store = SessionStore(backend, max_entries=1)
+        for uid in (1, 2):
+            store.new(uid, state="main")
+            await store.flush(uid)
+
+        async with store.active(1) as sess:
+            # Other users' updates arrive while user 1's handler is running
+            for uid in (2, 3, 2):
+                async with store.active(uid):
+                    pass
+            assert store.get(1) is sess
+            sess["quantity"] = 7
+
+        assert json.loads(await backend.load(1))["quantity"] == 7
+        # Unpinned again, so the bound applies on the next update
+        async with store.active(2):
+            pass
+        assert 1 not in store
+
+    asyncio.run(run())
+
+
+def test_active_session_survives_expiry():
+    async def run():
+        store = SessionStore(MemorySessionBackend(), idle_ttl=0)
+        store.new(1, state="main")
+        await store.flush(1)
+
+        async with store.active(1) as sess:
+            async with store.active(2):
+                pass
+            assert store.get(1) is sess
+
+        async with store.active(2):
+            pass
+        assert 1 not in store
+
+    asyncio.run(run())
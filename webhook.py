@@ -0,0 +1,130 @@
+"""Webhook mode: Telegram posts updates to an aiohttp server instead of us polling.
+
+Selected with BOT_MODE=webhook (see main.py); the rest comes from the
+environment:
+
+    WEBHOOK_SECRET  required; requests whose X-Telegram-Bot-Api-Secret-Token
+                    header does not match are refused with 401
+    WEBHOOK_URL     public https base URL, e.g. https://bot.example.com;
+                    if set, the webhook is registered with Telegram on
+                    startup (leave it unset to register it yourself)
+    WEBHOOK_PATH    path updates are posted to (default /webhook)
+    WEBAPP_HOST     listen address (default 0.0.0.0)
+    PORT            listen port (default 8080; set by Heroku-style platforms)
+
+A posted update is acknowledged at once and handled in a background task,
+so a slow report never holds up Telegram's delivery of other updates.
+``GET /healthz`` answers 200 while the database responds and 503 when it
+does not, for load balancer checks.
+
+The socket is opened with SO_REUSEPORT, so several processes can listen on
+the same port and share the traffic (sessions are then re-read from the
+database on every update, see SessionStore ``shared``).
+
+On SIGTERM/SIGINT the server stops accepting requests, waits up to
+SHUTDOWN_GRACE seconds for updates still being handled, then runs the
+dispatcher's shutdown hooks (pending admin alerts are delivered there) and
+closes the bot session.
+
+Trying it locally, without Telegram:
+
+    BOT_MODE=webhook WEBHOOK_SECRET=test python main.py
+    curl -H 'X-Telegram-Bot-Api-Secret-Token: test' \\
+         -H 'Content-Type: application/json' -d @update.json \\
+         http://localhost:8080/webhook
+"""
+import asyncio
+import logging
+import os
+import secrets
+
+from aiohttp import web
+
+import db
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+SHUTDOWN_GRACE = 30  # seconds to wait for updates in progress
+
+log = logging.getLogger("webhook")
+
+
+def create_app(dp, bot, secret, path="/webhook", webhook_url=None):
+    """The aiohttp application serving ``path`` (updates) and /healthz."""
+    in_flight = set()
+
+    async def handle_update(request):
+        # As bytes: compare_digest rejects non-ASCII str, which would be a 500.
+        # aiohttp decodes header bytes that are not UTF-8 as surrogates.
+        token = request.headers.get(SECRET_HEADER, "").encode("utf-8", "surrogateescape")
+        if not secrets.compare_digest(token, secret.encode()):
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        task = asyncio.create_task(feed(update))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        return web.json_response({})
+
+    async def feed(update):
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception:
+            log.exception("Update %s failed", update.get("update_id"))
+
+    async def health(request):
+        try:
+            await db.aget_data_version()
+        except Exception as e:
+            return web.json_response({"status": "error", "error": str(e)}, status=503)
+        return web.json_response({"status": "ok", "in_flight": len(in_flight)})
+
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+
+    async def on_startup(app):
+        await dp.emit_startup(bot=bot, **workflow_data)
+        if webhook_url:
+            await bot.set_webhook(
+                webhook_url.rstrip("/") + path,
+                secret_token=secret,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+
+    async def on_shutdown(app):
+        # The listening socket is already closed; let running updates finish.
+        # The webhook stays registered: other processes may still serve it,
+        # and Telegram keeps updates queued while none is up.
+        if in_flight:
+            _, still_running = await asyncio.wait(set(in_flight), timeout=SHUTDOWN_GRACE)
+            for task in still_running:
+                task.cancel()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/healthz", health)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def run(dp, bot):
+    """Serve the webhook until SIGTERM/SIGINT, with settings from the environment."""
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        raise ValueError("WEBHOOK_SECRET is missing! Check your .env file.")
+    app = create_app(
+        dp, bot, secret,
+        path=os.getenv("WEBHOOK_PATH", "/webhook"),
+        webhook_url=os.getenv("WEBHOOK_URL"),
+    )
+    web.run_app(
+        app,
+        host=os.getenv("WEBAPP_HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8080")),
+        reuse_port=True,
+        shutdown_timeout=SHUTDOWN_GRACE,
+        print=None,
+    )